@@ -0,0 +1,429 @@
+import sys
+import getopt
+import time
+import numpy as np
+import pandas as pd
+
+
+def benchmark_distance(data_files=('final_train.csv', 'final_test.csv')):
+    """
+    Compare the per-row geopy geodesic distance with the vectorized haversine batch distance.
+
+    Coordinates come from the offline pincode index, so the benchmark measures only the distance step.
+
+    Args:
+    - data_files (tuple, optional): CSV files with 'R_Pincode' and 'B_Pincode' columns. Defaults to the bundled train/test files.
+
+    Returns:
+    - dict: Timings (seconds) and accuracy of haversine relative to geodesic (kilometers).
+    """
+    from geopy.distance import geodesic
+    from PincodeIndex import PincodeGeoIndex
+    from PincodeProcess import batch_distance
+
+    df = pd.concat([pd.read_csv(path, usecols=['R_Pincode', 'B_Pincode']) for path in data_files], ignore_index=True)
+    index = PincodeGeoIndex()
+    coords1 = index.lookup_many(df['R_Pincode'])
+    coords2 = index.lookup_many(df['B_Pincode'])
+    known = ~(np.isnan(coords1).any(axis=1) | np.isnan(coords2).any(axis=1))
+    coords1, coords2 = coords1[known], coords2[known]
+
+    start = time.perf_counter()
+    per_row = np.array([geodesic(c1, c2).kilometers for c1, c2 in zip(coords1, coords2)])
+    per_row_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    haversine = batch_distance(coords1, coords2)
+    batch_time = time.perf_counter() - start
+
+    error = np.abs(haversine - per_row)
+    nonzero = per_row > 0
+    report = {
+        'pairs': int(known.sum()),
+        'pairs_without_coordinates': int((~known).sum()),
+        'per_row_geodesic_seconds': per_row_time,
+        'batch_haversine_seconds': batch_time,
+        'speedup': per_row_time / batch_time,
+        'max_abs_error_km': float(error.max()),
+        'mean_abs_error_km': float(error.mean()),
+        'max_relative_error': float((error[nonzero] / per_row[nonzero]).max()),
+    }
+    for key, value in report.items():
+        print(f"{key}: {value}")
+    return report
+
+
+def make_resume_corpus(folder, n_resumes=200, paragraphs=60, seed=0):
+    """
+    Write a synthetic corpus of .docx resumes built from the skill vocabulary.
+
+    Args:
+    - folder (str): Folder to write '<ID> Resume.docx' files into.
+    - n_resumes (int, optional): Number of resumes. Defaults to 200.
+    - paragraphs (int, optional): Paragraphs per resume. Defaults to 60.
+    - seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+    - list: Candidate IDs of the generated resumes.
+    """
+    import os
+    from docx import Document
+
+    rng = np.random.default_rng(seed)
+    words = [str(skill) for skill in pd.read_csv('rx_skills.csv')['skill_name'].dropna()]
+    words += ['english', 'hindi', 'tamil', 'sales', 'customer', 'relationship', 'loans', '@handle', '2019']
+    os.makedirs(folder, exist_ok=True)
+
+    candidate_ids = []
+    for i in range(n_resumes):
+        candidate_id = f'emp{i:04d}'
+        doc = Document()
+        for _ in range(paragraphs):
+            doc.add_paragraph(' '.join(rng.choice(words, size=rng.integers(3, 30))))
+        table = doc.add_table(rows=3, cols=2)
+        table.cell(0, 0).text = 'previous employer'
+        doc.save(os.path.join(folder, candidate_id.upper() + ' Resume.docx'))
+        candidate_ids.append(candidate_id)
+    return candidate_ids
+
+
+def benchmark_docx(n_resumes=200):
+    """
+    Compare python-docx and the streaming zip/XML reader on a synthetic resume corpus.
+
+    Args:
+    - n_resumes (int, optional): Number of synthetic resumes. Defaults to 200.
+
+    Returns:
+    - dict: Mean time (ms) and mean/max peak traced memory (KiB) per resume for each reader.
+    """
+    import tempfile
+    import tracemalloc
+    from CVManual import read_resume_docx, read_resume_xml, resume_path
+
+    report = {}
+    with tempfile.TemporaryDirectory() as folder:
+        paths = [resume_path(folder, candidate_id) for candidate_id in make_resume_corpus(folder, n_resumes)]
+        for name, reader in [('python-docx', read_resume_docx), ('streaming xml', read_resume_xml)]:
+            times, peaks = [], []
+            for path in paths:
+                tracemalloc.start()
+                start = time.perf_counter()
+                reader(path)
+                times.append(time.perf_counter() - start)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            report[name] = {
+                'mean_ms': 1000 * float(np.mean(times)),
+                'mean_peak_kib': float(np.mean(peaks)) / 1024,
+                'max_peak_kib': float(np.max(peaks)) / 1024,
+            }
+        report['identical_text'] = all(read_resume_docx(path) == read_resume_xml(path) for path in paths)
+
+    for key, value in report.items():
+        print(f"{key}: {value}")
+    return report
+
+
+def benchmark_languages(n_resumes=10000, words_per_resume=400, seed=0):
+    """
+    Compare the per-language substring loop with the tokenized single-pass language detector.
+
+    Args:
+    - n_resumes (int, optional): Number of synthetic cleaned resumes. Defaults to 10000.
+    - words_per_resume (int, optional): Words per resume. Defaults to 400.
+    - seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+    - dict: Timings (seconds) and the share of cells on which both detectors agree.
+    """
+    from CVManual import ResumeProcessor
+
+    rng = np.random.default_rng(seed)
+    vocabulary = ResumeProcessor.LANGUAGES + ['sales', 'loan', 'customer', 'banking', 'relationship', 'manager',
+                                              'the', 'and', 'englishspeaking', 'field', 'experience', 'target']
+    weights = np.where(np.isin(vocabulary, ResumeProcessor.LANGUAGES), 0.02, 1.0)
+    weights /= weights.sum()
+    texts = pd.Series([' '.join(rng.choice(vocabulary, size=words_per_resume, p=weights)) for _ in range(n_resumes)])
+    processor = ResumeProcessor('.')
+
+    start = time.perf_counter()
+    loop = pd.DataFrame()
+    for language in ResumeProcessor.LANGUAGES:
+        loop[language] = texts.apply(lambda x: 1 if language.lower() in str(x).lower() else 0)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matrix = processor.detect_languages(texts)
+    tokenized_time = time.perf_counter() - start
+
+    report = {
+        'resumes': n_resumes,
+        'loop_seconds': loop_time,
+        'tokenized_seconds': tokenized_time,
+        'speedup': loop_time / tokenized_time,
+        'loop_bytes': int(loop.memory_usage(index=False).sum()),
+        'tokenized_bytes': int(matrix.nbytes),
+        'agreement': float((loop.to_numpy() == matrix).mean()),
+    }
+    for key, value in report.items():
+        print(f"{key}: {value}")
+    return report
+
+
+def benchmark_sparse(n_rows=20000, categories=(10, 100, 1000), n_estimators=50, seed=0):
+    """
+    Compare dense one-hot features with CSR features for XGBoost training as the number of categories grows.
+
+    Each synthetic dataset has the five one-hot encoded columns of Preprocessor, each with the given number of
+    categories, plus ten numeric columns.
+
+    Args:
+    - n_rows (int, optional): Number of rows. Defaults to 20000.
+    - categories (tuple, optional): Categories per encoded column to measure. Defaults to (10, 100, 1000).
+    - n_estimators (int, optional): Trees per model. Defaults to 50.
+    - seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+    - dict: Per category count, matrix bytes and training time (seconds) of both paths.
+    """
+    import scipy.sparse
+    from xgboost import XGBClassifier
+    from FinalProcessing import Preprocessor
+
+    rng = np.random.default_rng(seed)
+    encoded_columns = Preprocessor().encoded_columns
+    numeric = rng.normal(size=(n_rows, 10)).astype(np.float32)
+    y = rng.integers(0, 2, size=n_rows)
+
+    report = {}
+    for n_categories in categories:
+        codes = rng.integers(0, n_categories, size=(n_rows, len(encoded_columns)))
+        df = pd.DataFrame(codes, columns=encoded_columns).astype(str)
+
+        dense = np.hstack([numeric, pd.get_dummies(df).to_numpy(dtype=np.float32)])
+        # One-hot block straight from the codes, offset per column
+        one_hot = scipy.sparse.csr_matrix((np.ones(codes.size, dtype=np.float32),
+                                           (np.repeat(np.arange(n_rows), len(encoded_columns)),
+                                            (codes + np.arange(len(encoded_columns)) * n_categories).ravel())),
+                                          shape=(n_rows, len(encoded_columns) * n_categories))
+        sparse = scipy.sparse.hstack([scipy.sparse.csr_matrix(numeric), one_hot], format='csr')
+
+        timings = {}
+        for name, features in [('dense', dense), ('sparse', sparse)]:
+            model = XGBClassifier(n_estimators=n_estimators, tree_method='hist', random_state=seed, use_label_encoder=False)
+            start = time.perf_counter()
+            model.fit(features, y, eval_metric='logloss')
+            timings[name] = time.perf_counter() - start
+
+        report[n_categories] = {
+            'features': dense.shape[1],
+            'dense_bytes': int(dense.nbytes),
+            'sparse_bytes': int(sparse.data.nbytes + sparse.indices.nbytes + sparse.indptr.nbytes),
+            'dense_fit_seconds': timings['dense'],
+            'sparse_fit_seconds': timings['sparse'],
+        }
+
+    for key, value in report.items():
+        print(f"{key}: {value}")
+    return report
+
+
+def benchmark_trees(n_rows=20000, n_features=100, n_estimators=200, seed=0):
+    """
+    Compare XGBClassifier.predict_proba with the exported NumPy tree evaluator, on dense and sparse input, with a
+    non-default base_score and with early stopping.
+
+    Args:
+    - n_rows (int, optional): Number of rows. Defaults to 20000.
+    - n_features (int, optional): Number of features, a tenth of them with missing values. Defaults to 100.
+    - n_estimators (int, optional): Trees per model. Defaults to 200.
+    - seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+    - dict: Prediction time (seconds) of both and their parity per input kind.
+    """
+    import tempfile
+    import os
+    import scipy.sparse
+    from xgboost import XGBClassifier
+    from TreeModel import export_trees, check_parity
+
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, n_features)).astype(np.float32)
+    X[:, :n_features // 10][rng.random((n_rows, n_features // 10)) < 0.2] = np.nan
+    y = (np.nan_to_num(X[:, :5]).sum(axis=1) + rng.normal(size=n_rows) > 0).astype(int)
+    sparse = scipy.sparse.csr_matrix(np.where(rng.random(X.shape) < 0.9, 0, np.nan_to_num(X)))
+
+    # Evaluating on shuffled labels makes early stopping end long before n_estimators
+    shuffled = rng.permutation(y)
+    # Non-default base_score checks the logit(base_score) margin; early stopping checks the best_iteration cut
+    cases = [('dense', X, {}, {}), ('sparse', sparse, {}, {}),
+             ('dense, base_score=0.3', X, {'base_score': 0.3}, {}),
+             ('sparse, base_score=0.8', sparse, {'base_score': 0.8}, {}),
+             ('dense, early stopping', X, {}, {'eval_set': [(X[:n_rows // 5], shuffled[:n_rows // 5])],
+                                               'early_stopping_rounds': 5, 'verbose': False})]
+    report = {}
+    for name, features, params, fit_params in cases:
+        model = XGBClassifier(n_estimators=n_estimators, max_depth=6, tree_method='hist', random_state=seed,
+                              use_label_encoder=False, **params)
+        model.fit(features, y, eval_metric='logloss', **fit_params)
+        with tempfile.TemporaryDirectory() as folder:
+            tree_model = export_trees(model, os.path.join(folder, 'trees.npz'))
+
+        start = time.perf_counter()
+        model.predict_proba(features)
+        xgboost_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        tree_model.predict_proba(features)
+        numpy_time = time.perf_counter() - start
+
+        report[name] = {'trees': len(tree_model.roots), 'xgboost_seconds': xgboost_time, 'numpy_seconds': numpy_time,
+                        **check_parity(model, tree_model, features)}
+
+    for key, value in report.items():
+        print(f"{key}: {value}")
+    return report
+
+
+def benchmark_training(n_rows=20000, n_features=80, n_trials=3, tree_method='hist', seed=0):
+    """
+    Compare trial times of rebuilding the fold matrices from pandas in every trial with reusing DMatrix folds.
+
+    Both run the same fixed parameters (100 trees) on a synthetic dataset.
+
+    Args:
+    - n_rows (int, optional): Number of rows. Defaults to 20000.
+    - n_features (int, optional): Number of features. Defaults to 80.
+    - n_trials (int, optional): Trials per path. Defaults to 3.
+    - tree_method (str, optional): XGBoost tree method. Defaults to 'hist'.
+    - seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+    - dict: Mean trial time (seconds) of both paths and the one-off DMatrix build time.
+    """
+    from optuna.trial import FixedTrial
+    from xgboost import XGBClassifier
+    from Train import ModelTrainer
+
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.normal(size=(n_rows, n_features)), columns=[f'feature_{i}' for i in range(n_features)])
+    df['Performance'] = (df.iloc[:, :5].sum(axis=1) + rng.normal(size=n_rows) > 0).astype(int)
+    params = {'n_estimators': 100, 'subsample': 0.8, 'colsample_bytree': 0.8, 'eta': 0.05, 'reg_alpha': 1,
+              'reg_lambda': 5, 'max_depth': 6, 'min_child_weight': 5}
+
+    start = time.perf_counter()
+    trainer = ModelTrainer(df, 'Performance', tree_method=tree_method, random_state=seed, early_stopping_rounds=None)
+    build_time = time.perf_counter() - start
+
+    # Fold of each DataFrame row, for slicing the DataFrame in every trial
+    fold_ids = np.empty(n_rows, dtype=int)
+    for fold, (start, stop) in enumerate(zip(trainer.fold_bounds[:-1], trainer.fold_bounds[1:])):
+        fold_ids[trainer.row_order[start:stop]] = fold
+    feature_cols = trainer.feature_cols
+
+    rebuild_times = []
+    for _ in range(n_trials):
+        start = time.perf_counter()
+        for fold in range(trainer.cv):
+            trn, val = df.loc[fold_ids != fold, :], df.loc[fold_ids == fold, :]
+            xtr, ytr, xval = trn[feature_cols].values, trn['Performance'].values, val[feature_cols].values
+            model = XGBClassifier(**params, tree_method=tree_method, random_state=seed, use_label_encoder=False)
+            model.fit(xtr, ytr, eval_metric='logloss')
+            model.predict(xval)
+        rebuild_times.append(time.perf_counter() - start)
+
+    for _ in range(n_trials):
+        trainer.objective(FixedTrial(params))
+
+    report = {
+        'dmatrix_build_seconds': build_time,
+        'rebuild_trial_seconds': float(np.mean(rebuild_times)),
+        'reuse_trial_seconds': float(np.mean(trainer.trial_seconds)),
+    }
+    for key, value in report.items():
+        print(f"{key}: {value}")
+    return report
+
+
+def benchmark_pruning(n_rows=10000, n_features=40, n_trials=20, tree_method='hist', seed=0):
+    """
+    Compare a full hyperparameter study with one using early stopping and median pruning.
+
+    Args:
+    - n_rows (int, optional): Number of rows. Defaults to 10000.
+    - n_features (int, optional): Number of features. Defaults to 40.
+    - n_trials (int, optional): Trials per study. Defaults to 20.
+    - tree_method (str, optional): XGBoost tree method. Defaults to 'hist'.
+    - seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+    - dict: Per study its wall-clock time (seconds), best cross-validated F1 and pruned trials, and the time saved.
+    """
+    from Train import ModelTrainer
+
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.normal(size=(n_rows, n_features)), columns=[f'feature_{i}' for i in range(n_features)])
+    df['Performance'] = (df.iloc[:, :5].sum(axis=1) + rng.normal(size=n_rows) > 0).astype(int)
+
+    report = {}
+    for name, early_stopping_rounds, pruner in [('full', None, None), ('early stopping + pruning', 50, 'median')]:
+        trainer = ModelTrainer(df.copy(), 'Performance', tree_method=tree_method, random_state=seed,
+                               early_stopping_rounds=early_stopping_rounds, pruner=pruner)
+        start = time.perf_counter()
+        study = trainer.optimize_hyperparams(n_trials=n_trials)
+        report[name] = {
+            'seconds': time.perf_counter() - start,
+            'best_f1': -study.best_value,
+            'pruned_trials': sum(trial.state.name == 'PRUNED' for trial in study.trials),
+        }
+    report['seconds_saved'] = report['full']['seconds'] - report['early stopping + pruning']['seconds']
+
+    for key, value in report.items():
+        print(f"{key}: {value}")
+    return report
+
+
+BENCHMARKS = {
+    'distance': benchmark_distance,
+    'docx': benchmark_docx,
+    'languages': benchmark_languages,
+    'sparse': benchmark_sparse,
+    'trees': benchmark_trees,
+    'training': benchmark_training,
+    'pruning': benchmark_pruning,
+}
+
+
+def main(argv):
+    """
+    Run one benchmark by name.
+
+    Args:
+    - argv (list): Command-line arguments.
+    """
+    usage = 'Usage: python Benchmarks.py -b <' + '|'.join(BENCHMARKS) + '>'
+    try:
+        opts, _ = getopt.getopt(argv, "hb:", ["benchmark="])
+    except getopt.GetoptError:
+        print(usage)
+        sys.exit(2)
+
+    name = ''
+    for opt, arg in opts:
+        if opt == '-h':
+            print(usage)
+            sys.exit()
+        elif opt in ("-b", "--benchmark"):
+            name = arg
+
+    if name not in BENCHMARKS:
+        print(usage)
+        sys.exit(2)
+
+    BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
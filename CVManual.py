@@ -1,7 +1,168 @@
+import hashlib
+import inspect
+import os
+import numpy as np
 import pandas as pd
 import re
+import zipfile
+from xml.etree import ElementTree
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from docx import Document
 from pathlib import Path
+from SkillMatcher import SkillMatcher
+from ResumeCache import ResumeCache
+
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# Text equivalents of run children, as python-docx renders them in Paragraph.text
+RUN_TEXT = {
+    WORD_NAMESPACE + "tab": "\t",
+    WORD_NAMESPACE + "ptab": "\t",
+    WORD_NAMESPACE + "cr": "\n",
+    WORD_NAMESPACE + "noBreakHyphen": "-",
+}
+
+
+def resume_path(folder_path, candidate_id):
+    """
+    Build the path of a candidate's resume file.
+
+    Args:
+    - folder_path (Path): Folder containing resume files.
+    - candidate_id (str): Candidate ID, used as the file name prefix.
+
+    Returns:
+    - Path: Path to '<CANDIDATEID> Resume.docx' in the folder.
+    """
+    return Path(folder_path).joinpath(str(candidate_id).upper() + " Resume.docx")
+
+
+def read_resume_docx(filepath):
+    """
+    Read the paragraph text of a .docx resume with python-docx.
+
+    Args:
+    - filepath (Path): Path to the .docx file.
+
+    Returns:
+    - str: Paragraphs joined with newlines.
+    """
+    doc = Document(filepath)
+    return "\n".join([para.text for para in doc.paragraphs])
+
+
+def read_resume_xml(filepath):
+    """
+    Read the paragraph text of a .docx resume by streaming word/document.xml straight from the zip.
+
+    Produces the same text as read_resume_docx: only top-level body paragraphs are read (not
+    tables), and only runs that are direct children of a paragraph or of a hyperlink in it.
+    Parsed elements are discarded paragraph by paragraph, so memory does not grow with the document.
+
+    Args:
+    - filepath (Path): Path to the .docx file.
+
+    Returns:
+    - str: Paragraphs joined with newlines.
+    """
+    paragraph_path = [WORD_NAMESPACE + "document", WORD_NAMESPACE + "body", WORD_NAMESPACE + "p"]
+    run_parents = ([WORD_NAMESPACE + "r"], [WORD_NAMESPACE + "hyperlink", WORD_NAMESPACE + "r"])
+
+    paragraphs = []
+    parts = []
+    path = []
+    with zipfile.ZipFile(filepath) as archive, archive.open("word/document.xml") as document:
+        for event, element in ElementTree.iterparse(document, events=("start", "end")):
+            if event == "start":
+                path.append(element.tag)
+                continue
+
+            path.pop()
+            if path[:3] == paragraph_path and path[3:] in run_parents:
+                if element.tag == WORD_NAMESPACE + "t":
+                    parts.append(element.text or "")
+                elif element.tag == WORD_NAMESPACE + "br":
+                    if element.get(WORD_NAMESPACE + "type", "textWrapping") == "textWrapping":
+                        parts.append("\n")
+                elif element.tag in RUN_TEXT:
+                    parts.append(RUN_TEXT[element.tag])
+            elif len(path) == 2 and path[1] == WORD_NAMESPACE + "body":
+                if element.tag == WORD_NAMESPACE + "p":
+                    paragraphs.append("".join(parts))
+                parts = []
+                element.clear()
+    return "\n".join(paragraphs)
+
+
+def read_resume(filepath):
+    """
+    Read the paragraph text of a .docx resume, using the streaming XML reader and falling back
+    to python-docx if it fails.
+
+    Args:
+    - filepath (Path): Path to the .docx file.
+
+    Returns:
+    - str: Paragraphs joined with newlines.
+    """
+    try:
+        return read_resume_xml(filepath)
+    except Exception:
+        return read_resume_docx(filepath)
+
+
+def clean_resume_text(text):
+    """
+    Remove Twitter handles and non-alphabetic characters, collapse whitespace and lowercase the text.
+
+    Args:
+    - text (str): Text to be cleaned.
+
+    Returns:
+    - str: Cleaned text.
+    """
+    # Remove Twitter handles starting with '@'
+    text = re.sub(r"@\w+", "", text)
+    # Remove non-alphanumeric characters and extra whitespace
+    text = re.sub(r"[^a-zA-Z\s]", "", text)
+    # Convert multiple whitespace characters to a single space
+    text = re.sub(r"\s+", " ", text)
+    # Convert the text to lowercase
+    return text.lower()
+
+
+def parse_resume(folder_path, candidate_id):
+    """
+    Extract and clean one candidate's resume without printing errors.
+    Defined at module level so it can run in worker processes.
+
+    Args:
+    - folder_path (Path): Folder containing resume files.
+    - candidate_id (str): Candidate ID.
+
+    Returns:
+    - tuple: (cleaned text or None, error message or None).
+    """
+    filepath = resume_path(folder_path, candidate_id)
+    try:
+        text = read_resume(filepath)
+    except Exception as e:
+        return None, f"Error occurred while processing {filepath}: {e}"
+    return clean_resume_text(text), None
+
+
+def parser_fingerprint():
+    """
+    Fingerprint of the code that turns a resume file into cleaned text.
+
+    Returns:
+    - str: SHA-256 over the source of the readers and the cleaning function.
+    """
+    digest = hashlib.sha256()
+    for function in [read_resume_docx, read_resume_xml, read_resume, clean_resume_text, parse_resume]:
+        digest.update(inspect.getsource(function).encode())
+    return digest.hexdigest()
 
 
 class ResumeProcessor:
@@ -10,14 +171,43 @@ class ResumeProcessor:
 
     Args:
     - folder_path (str): Path to the folder containing resume files.
+    - skills_file (str, optional): Path to the skills CSV file. Defaults to 'rx_skills.csv'.
+    - word_boundary (bool, optional): Only match whole-word skills, so 'energy' does not match 'synergy'. Defaults to False.
+    - cache_path (str, optional): Path of a ResumeCache database, so reruns only parse new or changed resumes. Defaults to None (no cache).
 
     Attributes:
     - folder_path (Path): Path object representing the folder containing resume files.
+    - skill_matcher (SkillMatcher): Automaton over the skills file, built on first use.
+    - failures (pandas.DataFrame): Resumes that could not be parsed by the last process_dataframe call.
+    - cache (ResumeCache): Cache of parsed resumes, or None.
     """
 
-    def __init__(self, folder_path):
+    LANGUAGES = [
+        'assamese', 'bengali', 'gujarati', 'hindi', 'kannada', 'kashmiri', 'konkani',
+        'malayalam', 'manipuri', 'marathi', 'nepali', 'oriya', 'punjabi', 'sanskrit', 'english',
+        'sindhi', 'tamil', 'telugu', 'urdu', 'bodo', 'santhali', 'maithili', 'dogri'
+    ]
+
+    def __init__(self, folder_path, skills_file="rx_skills.csv", word_boundary=False, cache_path=None):
         current_path = Path.cwd()  # Get the current working directory
         self.folder_path = current_path / folder_path  # Combine paths using Path objects
+        self.skills_file = skills_file
+        self.word_boundary = word_boundary
+        self.skill_matcher = None
+        self.failures = pd.DataFrame(columns=["CandidateID", "Error"])
+        self.cache = ResumeCache(cache_path, parser=parser_fingerprint()) if cache_path else None
+
+    def get_skill_matcher(self):
+        """
+        Get the skill automaton, building it from the skills file on first use.
+
+        Returns:
+        - SkillMatcher: Automaton over all skills in the skills file.
+        """
+        if self.skill_matcher is None:
+            skills = pd.read_csv(self.skills_file)
+            self.skill_matcher = SkillMatcher(skills["skill_name"], word_boundary=self.word_boundary)
+        return self.skill_matcher
 
     def extract_text(self, filename):
         """
@@ -29,11 +219,9 @@ class ResumeProcessor:
         Returns:
         - str: Extracted text from the resume file.
         """
+        filepath = resume_path(self.folder_path, filename)
         try:
-            filepath = self.folder_path.joinpath(filename.upper() + " Resume.docx")
-            doc = Document(filepath)
-            text = "\n".join([para.text for para in doc.paragraphs])
-            return text
+            return read_resume(filepath)
         except Exception as e:
             print(f"Error occurred while processing {filepath}: {e}")
             return None
@@ -49,73 +237,189 @@ class ResumeProcessor:
         - str: Cleaned text.
         """
         try:
-            # Remove Twitter handles starting with '@'
-            text = re.sub(r"@\w+", "", text)
-            # Remove non-alphanumeric characters and extra whitespace
-            text = re.sub(r"[^a-zA-Z\s]", "", text)
-            # Convert multiple whitespace characters to a single space
-            text = re.sub(r"\s+", " ", text)
-            # Convert the text to lowercase
-            text = text.lower()
-            return text
+            return clean_resume_text(text)
         except Exception as e:
             print(f"Error occurred while processing: {e}")
             return None
 
-    def find_skills(self, text, skills):
+    def find_skills(self, text, skills=None):
         """
         Find skills mentioned in the text.
 
         Args:
         - text (str): Text to search for skills.
-        - skills (pandas.DataFrame): DataFrame containing skills to search for.
+        - skills (pandas.DataFrame, optional): DataFrame containing skills to search for. Defaults to the skills file.
 
         Returns:
         - list: List of skills found in the text.
         """
-        found_skills = []
-        for skill_name in skills["skill_name"]:
-            if str(skill_name).lower() in str(text).lower():
-                found_skills.append(skill_name)
-        return found_skills
+        if skills is None:
+            return self.get_skill_matcher().find(text)
+        return SkillMatcher(skills["skill_name"], word_boundary=self.word_boundary).find(text)
+
+    def parse_resumes(self, candidate_ids, n_jobs=1, chunksize=None):
+        """
+        Extract and clean the resumes of many candidates, optionally in parallel worker processes.
+
+        Args:
+        - candidate_ids (iterable): Candidate IDs.
+        - n_jobs (int, optional): Number of worker processes; 1 runs serially, None uses all CPUs. Defaults to 1.
+        - chunksize (int, optional): Resumes per task sent to a worker. Defaults to about four tasks per worker.
+
+        Returns:
+        - tuple: List of cleaned texts in candidate order (None where parsing failed) and a DataFrame
+          of failures with 'CandidateID' and 'Error' columns.
+        """
+        candidate_ids = list(candidate_ids)
+        worker = partial(parse_resume, self.folder_path)
+        n_jobs = n_jobs or os.cpu_count()
+
+        if n_jobs == 1:
+            results = [worker(candidate_id) for candidate_id in candidate_ids]
+        else:
+            if chunksize is None:
+                chunksize = max(1, len(candidate_ids) // (n_jobs * 4))
+            # Executor.map yields results in submission order, so texts stay aligned with candidates
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                results = list(executor.map(worker, candidate_ids, chunksize=chunksize))
+
+        texts = [text for text, _ in results]
+        failures = pd.DataFrame(
+            [(candidate_id, error) for candidate_id, (_, error) in zip(candidate_ids, results) if error],
+            columns=["CandidateID", "Error"]
+        )
+        return texts, failures
+
+    def vocabulary_fingerprint(self):
+        """
+        Fingerprint of everything language and skill results depend on besides the resume text.
+
+        Returns:
+        - str: SHA-256 over the skills file contents, the language list and the matching mode.
+        """
+        digest = hashlib.sha256()
+        with open(self.skills_file, "rb") as f:
+            digest.update(f.read())
+        digest.update("\n".join(self.LANGUAGES).encode())
+        digest.update(b"languages=tokens")
+        digest.update(f"word_boundary={self.word_boundary}".encode())
+        return digest.hexdigest()
+
+    def load_resumes(self, candidate_ids, n_jobs=1, chunksize=None):
+        """
+        Get cleaned resume texts, parsing only resumes that are not in the cache or have changed.
+
+        Args:
+        - candidate_ids (iterable): Candidate IDs.
+        - n_jobs (int, optional): Number of worker processes for parsing; None uses all CPUs. Defaults to 1.
+        - chunksize (int, optional): Resumes per task sent to a worker. Defaults to about four tasks per worker.
+
+        Returns:
+        - tuple: List of cleaned texts in candidate order (None where parsing failed) and a DataFrame of failures.
+        """
+        candidate_ids = list(candidate_ids)
+        if self.cache is None:
+            return self.parse_resumes(candidate_ids, n_jobs=n_jobs, chunksize=chunksize)
+
+        texts = [self.cache.get_text(resume_path(self.folder_path, candidate_id)) for candidate_id in candidate_ids]
+        stale = [i for i, text in enumerate(texts) if text is None]
+        parsed, failures = self.parse_resumes([candidate_ids[i] for i in stale], n_jobs=n_jobs, chunksize=chunksize)
+        for i, text in zip(stale, parsed):
+            texts[i] = text
+            if text is not None:
+                self.cache.put_text(resume_path(self.folder_path, candidate_ids[i]), text)
+        return texts, failures
+
+    def detect_languages(self, texts):
+        """
+        Flag the languages mentioned in each text.
+        Each cleaned text is tokenized once and intersected with the set of language names; a language
+        is flagged when it appears as a whole word, and the whole indicator matrix is filled in one scatter.
+
+        Args:
+        - texts (iterable): Cleaned resume texts (lowercase letters and single spaces); None counts as empty.
+
+        Returns:
+        - numpy.ndarray: (n_texts, len(LANGUAGES)) uint8 matrix of 0/1 flags in LANGUAGES order.
+        """
+        texts = list(texts)
+        language_index = {language: column for column, language in enumerate(self.LANGUAGES)}
+        language_words = set(language_index)
+        rows, columns = [], []
+        for row, text in enumerate(texts):
+            if not isinstance(text, str):
+                continue
+            for token in language_words.intersection(text.split()):
+                rows.append(row)
+                columns.append(language_index[token])
+
+        matrix = np.zeros((len(texts), len(self.LANGUAGES)), dtype=np.uint8)
+        matrix[rows, columns] = 1
+        return matrix
 
-    def process_dataframe(self, df):
+    def analyze_resumes(self, candidate_ids, texts):
+        """
+        Find languages and skills for each resume, reusing cached results computed with the current vocabulary.
+
+        Args:
+        - candidate_ids (iterable): Candidate IDs.
+        - texts (iterable): Cleaned resume texts, aligned with candidate_ids.
+
+        Returns:
+        - tuple: (n_resumes, len(LANGUAGES)) uint8 matrix of language flags, and per resume the list of skills found.
+        """
+        texts = list(texts)
+        languages = np.zeros((len(texts), len(self.LANGUAGES)), dtype=np.uint8)
+        skills = [None] * len(texts)
+        todo = list(range(len(texts)))
+
+        if self.cache is not None:
+            vocabulary = self.vocabulary_fingerprint()
+            paths = [resume_path(self.folder_path, candidate_id) for candidate_id in candidate_ids]
+            todo = []
+            for i, (path, text) in enumerate(zip(paths, texts)):
+                cached = self.cache.get_results(path, vocabulary) if text is not None else None
+                if cached is None:
+                    todo.append(i)
+                else:
+                    languages[i], skills[i] = cached
+
+        skill_matcher = self.get_skill_matcher()
+        todo_texts = [texts[i] for i in todo]
+        languages[todo] = self.detect_languages(todo_texts)
+        for i, text in zip(todo, todo_texts):
+            skills[i] = skill_matcher.find(text)
+
+        if self.cache is not None:
+            # A resume that could not be read has no results worth keeping; caching its empty ones would
+            # outlive the failure once the file is back unchanged
+            parsed = [i for i in todo if texts[i] is not None]
+            self.cache.put_results([paths[i] for i in parsed], vocabulary,
+                                   [languages[i] for i in parsed], [skills[i] for i in parsed])
+        return languages, skills
+
+    def process_dataframe(self, df, n_jobs=1, chunksize=None):
         """
         Process a DataFrame containing candidate information.
+        Resumes that cannot be parsed are recorded in self.failures instead of being printed.
 
         Args:
         - df (pandas.DataFrame): DataFrame containing candidate information.
+        - n_jobs (int, optional): Number of worker processes for resume parsing; None uses all CPUs. Defaults to 1.
+        - chunksize (int, optional): Resumes per task sent to a worker. Defaults to about four tasks per worker.
 
         Returns:
         - tuple: Tuple containing language DataFrame and skill DataFrame.
         """
-        df["Extracted_Text"] = df["CandidateID"].apply(self.extract_text)
-        df["Extracted_Text"] = df["Extracted_Text"].apply(self.clean_text)
+        df["Extracted_Text"], self.failures = self.load_resumes(df["CandidateID"], n_jobs=n_jobs, chunksize=chunksize)
+        languages, skills = self.analyze_resumes(df["CandidateID"], df["Extracted_Text"])
 
         # Create DataFrame for languages
-        language_columns = [
-            'assamese', 'bengali', 'gujarati', 'hindi', 'kannada', 'kashmiri', 'konkani',
-            'malayalam', 'manipuri', 'marathi', 'nepali', 'oriya', 'punjabi', 'sanskrit', 'english',
-            'sindhi', 'tamil', 'telugu', 'urdu', 'bodo', 'santhali', 'maithili', 'dogri'
-        ]
-        language_df = pd.DataFrame(columns=["CandidateID"] + language_columns)
-        language_df["CandidateID"] = df["CandidateID"]
-
-        # Check for language proficiency in each language
-        for language in language_df.columns[1:]:
-            language_df[language] = df["Extracted_Text"].apply(
-                lambda x: 1 if language.lower() in str(x).lower() else 0
-            )
+        language_df = pd.DataFrame(languages, columns=self.LANGUAGES, index=df.index)
+        language_df.insert(0, "CandidateID", df["CandidateID"])
 
         # Create DataFrame for skills
-        skill_df = pd.DataFrame(columns=["CandidateID", "Skill", "Skill_count"])
-        skill_df["CandidateID"] = df["CandidateID"]
-
-        # Read skills from file
-        skill = pd.read_csv("rx_skills.csv")
-
-        # Find skills in each resume
-        skill_df["Skill"] = [self.find_skills(text, skill) for text in df["Extracted_Text"]]
-        skill_df["Skill_count"] = skill_df["Skill"].apply(len)
+        skill_df = pd.DataFrame({"CandidateID": df["CandidateID"], "Skill": skills}, index=df.index)
+        skill_df["Skill_count"] = [len(found) for found in skills]
 
         return language_df, skill_df
@@ -0,0 +1,163 @@
+import hashlib
+import inspect
+import json
+import os
+import pandas as pd
+
+try:
+    from pyarrow import ArrowException
+except ImportError:
+    # Without pyarrow, to_parquet raises ImportError, which is caught on its own
+    ArrowException = ImportError
+
+
+def frame_fingerprint(df):
+    """
+    Compute a content fingerprint of a DataFrame (values, index, column names and dtypes).
+
+    Args:
+    - df (pandas.DataFrame): DataFrame with hashable cell values.
+
+    Returns:
+    - str: Hex digest.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(col), str(dtype)] for col, dtype in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def source_fingerprint(objects):
+    """
+    Compute a fingerprint of the source code of the given modules, classes or functions.
+
+    Args:
+    - objects (list): Code a stage depends on.
+
+    Returns:
+    - str: Hex digest.
+    """
+    digest = hashlib.sha256()
+    for obj in objects:
+        digest.update(inspect.getsource(obj).encode())
+    return digest.hexdigest()
+
+
+def folder_fingerprint(folder_path):
+    """
+    Compute a fingerprint of a folder listing (file names, sizes and modification times).
+    Only file metadata is read, so this stays cheap for large folders.
+
+    Args:
+    - folder_path (str): Path to the folder.
+
+    Returns:
+    - str: Hex digest.
+    """
+    digest = hashlib.sha256()
+    entries = sorted((entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+                     for entry in os.scandir(folder_path) if entry.is_file())
+    digest.update(json.dumps(entries).encode())
+    return digest.hexdigest()
+
+
+class StageCheckpoints:
+    """
+    Columnar checkpoints of pipeline stage outputs, one per stage and input chunk.
+
+    Each checkpoint is a Parquet file (or a pickle when Parquet cannot represent the data, e.g. object
+    columns of mixed types) plus a small JSON manifest holding the stage fingerprint. The manifest is
+    written last, so a checkpoint without one is never considered valid. Stage fingerprints are chained:
+    each covers the fingerprint of the stage before it, so a change to the input, the code or the
+    configuration of a stage invalidates that stage and every stage after it.
+
+    Args:
+    - directory (str): Folder to store the checkpoints in; created if missing.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def stage_fingerprint(parent, stage, code, config=None):
+        """
+        Compute the fingerprint of a stage's output.
+
+        Args:
+        - parent (str): Fingerprint of the stage input (the previous stage, or the raw chunk).
+        - stage (str): Stage name.
+        - code (str): Fingerprint of the stage's source code.
+        - config (dict, optional): JSON-serializable stage configuration. Defaults to None.
+
+        Returns:
+        - str: Hex digest.
+        """
+        payload = json.dumps([parent, stage, code, config], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _base_path(self, stage, chunk):
+        return os.path.join(self.directory, f"{stage}_{chunk:05d}")
+
+    def load(self, stage, chunk, fingerprint):
+        """
+        Load a stage checkpoint if it was written with the given fingerprint.
+
+        Args:
+        - stage (str): Stage name.
+        - chunk (int): Chunk number.
+        - fingerprint (str): Expected stage fingerprint.
+
+        Returns:
+        - pandas.DataFrame or None: Stage output, or None if there is no valid checkpoint.
+        """
+        base_path = self._base_path(stage, chunk)
+        try:
+            with open(base_path + '.json', 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('fingerprint') != fingerprint:
+            return None
+
+        try:
+            if manifest['format'] == 'parquet':
+                return pd.read_parquet(base_path + '.parquet')
+            return pd.read_pickle(base_path + '.pkl')
+        except Exception as e:
+            print(f"Ignoring unreadable checkpoint {base_path}: {e}")
+            return None
+
+    def save(self, stage, chunk, fingerprint, df):
+        """
+        Write a stage checkpoint.
+
+        Args:
+        - stage (str): Stage name.
+        - chunk (int): Chunk number.
+        - fingerprint (str): Stage fingerprint.
+        - df (pandas.DataFrame): Stage output.
+
+        Returns:
+        - str: Path of the written data file.
+        """
+        base_path = self._base_path(stage, chunk)
+        # Invalidate the old checkpoint before its data file is overwritten
+        if os.path.exists(base_path + '.json'):
+            os.remove(base_path + '.json')
+
+        try:
+            path, file_format = base_path + '.parquet', 'parquet'
+            df.to_parquet(path)
+        except (ImportError, ValueError, TypeError, NotImplementedError, ArrowException):
+            # Parquet needs pyarrow and one type per column (pyarrow raises ArrowNotImplementedError, a
+            # NotImplementedError, for e.g. nested object columns); fall back to pickle otherwise
+            if os.path.exists(path):
+                os.remove(path)
+            path, file_format = base_path + '.pkl', 'pickle'
+            df.to_pickle(path)
+
+        with open(base_path + '.json.tmp', 'w') as f:
+            json.dump({'stage': stage, 'chunk': chunk, 'fingerprint': fingerprint, 'format': file_format}, f)
+        os.replace(base_path + '.json.tmp', base_path + '.json')
+        return path
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+
+def bytes_per_row(df):
+    """
+    Measure the memory used per row of a DataFrame, including the contents of object columns.
+
+    Args:
+    - df (pandas.DataFrame): DataFrame to measure.
+
+    Returns:
+    - float: Bytes per row (0 for an empty DataFrame).
+    """
+    if len(df) == 0:
+        return 0.0
+    return float(df.memory_usage(index=True, deep=True).sum()) / len(df)
+
+
+def compact_dataframe(df, max_unique_ratio=0.5, exclude=('CandidateID',)):
+    """
+    Reduce the memory footprint of a DataFrame without changing its values.
+
+    String columns with few distinct values become 'category'; integer columns are downcast to the
+    smallest integer type holding their range, and float columns to float32 when every value survives
+    the round trip exactly. Object columns holding anything other than strings (e.g. skill lists) are
+    left as they are.
+
+    Args:
+    - df (pandas.DataFrame): DataFrame to compact.
+    - max_unique_ratio (float, optional): Largest ratio of distinct values to rows for a string column
+      to become categorical. Defaults to 0.5.
+    - exclude (tuple, optional): Columns to leave untouched. Defaults to ('CandidateID',).
+
+    Returns:
+    - pandas.DataFrame: Compacted copy of the DataFrame.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if col in exclude:
+            continue
+        values = df[col]
+
+        if values.dtype == object:
+            if pd.api.types.infer_dtype(values, skipna=True) != 'string':
+                continue
+            if values.nunique(dropna=True) <= max_unique_ratio * len(values):
+                df[col] = values.astype('category')
+
+        elif pd.api.types.is_bool_dtype(values):
+            continue
+
+        elif pd.api.types.is_integer_dtype(values):
+            df[col] = pd.to_numeric(values, downcast='integer')
+
+        elif pd.api.types.is_float_dtype(values) and values.dtype != np.float32:
+            narrowed = values.to_numpy().astype(np.float32)
+            if np.array_equal(narrowed, values.to_numpy(), equal_nan=True):
+                df[col] = pd.Series(narrowed, index=values.index)
+
+    return df
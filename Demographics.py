@@ -1,5 +1,9 @@
 import pandas as pd
+import numpy as np
 import re
+from collections import Counter
+from DistrictIndex import DistrictIndex, normalize_district
+from PincodeIndex import load_pincode_records
 
 class DistrictDataProcessor:
     """
@@ -11,19 +15,26 @@ class DistrictDataProcessor:
     Attributes:
     - district_file_path (str): Path to the district demographics CSV file.
     - districts (pandas.DataFrame): DataFrame containing district demographics data.
+    - index (DistrictIndex): Resolves district names, including spelling variants, to rows of districts.
+    - states (list): State of each row of districts, None where it could not be inferred.
+    - values (numpy.ndarray): Population and density per district code, with a trailing NaN row for unmatched names.
     """
 
     def __init__(self, district_file_path='.district_demographics.csv'):
         self.district_file_path = district_file_path
         self.districts = None
+        self.index = None
+        self.states = None
+        self.values = None
 
     def load_district_data(self):
         """
         Load district demographics data from CSV file and perform preprocessing.
 
         """
-        # Read the district data from CSV
+        # Read the district data from CSV; blank rows separate the districts of one state from the next
         self.districts = pd.read_csv(self.district_file_path)
+        self.districts['Block'] = self.districts['Ddistrict'].isna().cumsum()
         # Drop unnecessary column
         self.districts.drop(columns=['Unnamed: 1'], inplace=True)
         # Drop rows with NaN values
@@ -34,7 +45,32 @@ class DistrictDataProcessor:
         self.districts['Population'] = self.districts['Population'].apply(self.extract_number)
         self.districts['Area'] = self.districts['Area'].apply(self.extract_number)
         self.districts['Density'] = self.districts['Density'].apply(self.extract_number)
+
+        # Build the name index and the value table gathered by merge_district_data
+        self.states = self.infer_states()
+        self.index = DistrictIndex(self.districts['Ddistrict'], states=self.states)
+        values = self.districts[['Population', 'Density']].to_numpy(dtype=float)
+        self.values = np.vstack([values, np.full((1, 2), np.nan)])
         
+    def infer_states(self):
+        """
+        Infer the state of each district. The file has no state column, so every block of districts gets
+        the state most of its names have among the districts of the bundled pincode table.
+
+        Returns:
+        - list: Lowercase state per row of districts, None for blocks without any known name.
+        """
+        records = load_pincode_records().dropna(subset=['District', 'State'])
+        key_states = {}
+        for district, state in records[['District', 'State']].drop_duplicates().itertuples(index=False):
+            key_states.setdefault(normalize_district(district), set()).add(state.lower())
+
+        block_states = {}
+        for block, names in self.districts.groupby('Block')['Ddistrict']:
+            votes = Counter(state for name in names for state in key_states.get(normalize_district(name), ()))
+            block_states[block] = votes.most_common(1)[0][0] if votes else None
+        return [block_states[block] for block in self.districts['Block']]
+
     def extract_number(self, string):
         """
         Extract numeric values from a string.
@@ -66,6 +102,10 @@ class DistrictDataProcessor:
     def merge_district_data(self, df):
         """
         Merge district demographics data with another DataFrame.
+        Each row gets the population and density of its residential and branch districts; names are
+        matched through the district index, so spelling variants and known renames resolve too, but only
+        within the row's state (R_State and B_State from the pincode stage). When the demographics
+        file lists a district twice, the first entry is used.
 
         Args:
         - df (pandas.DataFrame): DataFrame to merge with district demographics data.
@@ -77,14 +117,19 @@ class DistrictDataProcessor:
             print("District data not loaded. Please call load_district_data() first.")
             return
 
-        # Merge data on R_District
-        df = pd.merge(df, self.districts, how='left', left_on='R_District', right_on='Ddistrict')
-        df.rename(columns={'Population': 'R_Population', 'Density': 'R_Density'}, inplace=True)
-        df.drop(columns=['Ddistrict', 'Area'], inplace=True)
+        # Resolve residential and branch districts in one pass, each within the state of its pincode;
+        # code -1 picks the trailing NaN row
+        codes = self.index.resolve_many(np.concatenate([np.asarray(df['R_District'], dtype=object),
+                                                        np.asarray(df['B_District'], dtype=object)]),
+                                        np.concatenate([np.asarray(df['R_State'], dtype=object),
+                                                        np.asarray(df['B_State'], dtype=object)]))
+        gathered = self.values[codes]
+        residential, branch = gathered[:len(df)], gathered[len(df):]
 
-        # Merge data on B_District
-        df = pd.merge(df, self.districts, how='left', left_on='B_District', right_on='Ddistrict')
-        df.rename(columns={'Population': 'B_Population', 'Density': 'B_Density'}, inplace=True)
-        df.drop(columns=['Ddistrict', 'Area'], inplace=True)
+        df = df.copy()
+        df['R_Population'] = residential[:, 0]
+        df['R_Density'] = residential[:, 1]
+        df['B_Population'] = branch[:, 0]
+        df['B_Density'] = branch[:, 1]
 
         return df
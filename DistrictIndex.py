@@ -0,0 +1,229 @@
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+import numpy as np
+import pandas as pd
+
+
+def normalize_district(name):
+    """
+    Normalize a district name for matching: lowercase, without bracketed qualifiers, footnote markers,
+    punctuation or the word 'district', and with single spaces.
+
+    Args:
+    - name (str): District name.
+
+    Returns:
+    - str: Normalized name ('' for a missing name).
+    """
+    if not isinstance(name, str):
+        return ''
+    name = re.sub(r'\(.*?\)|\[.*?\]', ' ', name.lower())
+    name = re.sub(r'[^a-z0-9]+', ' ', name)
+    name = re.sub(r'\bdistrict\b', ' ', name)
+    return ' '.join(name.split())
+
+
+# Districts known under another name: normalized variant to the normalized name in the demographics file.
+# Renamed districts are often spelled close to an unrelated district elsewhere (baleshwar / bageshwar),
+# so they are listed here instead of being left to fuzzy matching.
+DISTRICT_ALIASES = {
+    'baleshwar': 'balasore',
+    'deogarh': 'debagarh',
+    'anantapur': 'ananthapuramu',
+    'y s r': 'ysr kadapa',
+    'spsr nellore': 'nellore',
+    'kamrup metro': 'kamrup metropolitan',
+    'mahesana': 'mehsana',
+    'bengaluru urban': 'bangalore urban',
+    'bengaluru rural': 'bangalore rural',
+    'mysuru': 'mysore',
+    'vijayapura': 'bijapur',
+    'tuticorin': 'thoothukudi',
+    'pondicherry': 'puducherry',
+    's a s nagar': 'sahibzada ajit singh nagar',
+    'kheri': 'lakhimpur kheri',
+    '24 paraganas north': 'north 24 parganas',
+    '24 paraganas south': 'south 24 parganas',
+}
+
+
+def trigrams(key):
+    """
+    Character trigrams of a normalized key, padded so word starts and ends count.
+
+    Args:
+    - key (str): Normalized name.
+
+    Returns:
+    - set: Trigrams.
+    """
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class DistrictIndex:
+    """
+    Index of district names resolving spelling variants to integer codes.
+
+    Names are resolved by exact match first, then by normalized key, then through the alias table of
+    known renames, then fuzzily: a trigram index proposes candidate districts of the row's own state
+    and the closest one by edit similarity is accepted if it is similar enough and clearly closer than
+    the runner-up. Anything else stays unmatched. When a name is shared by districts of several states,
+    the one in the row's state is used. Each distinct (name, state) pair is resolved once and memoized.
+
+    Args:
+    - names (iterable): District names; the code of a district is its position.
+    - states (iterable, optional): State of each district, None where unknown. Districts without a state
+      are never fuzzy candidates. Defaults to None (no states, so no fuzzy matching).
+    - min_similarity (float, optional): Smallest difflib similarity ratio accepted for a fuzzy match. Defaults to 0.85.
+    - min_margin (float, optional): Smallest lead in similarity of the best fuzzy candidate over the runner-up.
+      Defaults to 0.05.
+    - max_candidates (int, optional): Trigram candidates compared by edit similarity. Defaults to 10.
+    - aliases (dict, optional): Normalized variant to normalized district name. Defaults to DISTRICT_ALIASES.
+
+    Attributes:
+    - names (list): District names in code order.
+    - states (list): Lowercase state of each district, None where unknown.
+    - keys (dict): Normalized key to the codes of the districts with that key.
+    - postings (dict): Trigram to list of codes of the keys containing it.
+    - resolved (dict): Memo of (name, state) to (code, match kind), code -1 when unmatched.
+    - counts (Counter): Rows resolved per match kind ('exact', 'normalized', 'alias', 'fuzzy', 'unmatched')
+      since the last reset_counts.
+    """
+
+    KINDS = ['exact', 'normalized', 'alias', 'fuzzy', 'unmatched']
+
+    def __init__(self, names, states=None, min_similarity=0.85, min_margin=0.05, max_candidates=10,
+                 aliases=DISTRICT_ALIASES):
+        self.names = list(names)
+        states = [None] * len(self.names) if states is None else list(states)
+        self.states = [state.lower() if isinstance(state, str) else None for state in states]
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.max_candidates = max_candidates
+        self.aliases = aliases
+
+        self.exact = {}
+        self.keys = {}
+        for code, name in enumerate(self.names):
+            self.exact.setdefault(name, []).append(code)
+            key = normalize_district(name)
+            if key:
+                self.keys.setdefault(key, []).append(code)
+
+        # Fuzzy candidates are distinct keys, each with the districts of known state sharing it
+        self.key_names = {}
+        self.postings = {}
+        for key, codes in self.keys.items():
+            for code in codes:
+                if self.states[code] is None:
+                    continue
+                self.key_names[code] = key
+                for gram in trigrams(key):
+                    self.postings.setdefault(gram, []).append(code)
+
+        self.resolved = {}
+        self.counts = Counter()
+
+    def _pick(self, codes, state):
+        """
+        Pick the district of the row's state among districts sharing a name, else the first one.
+        """
+        for code in codes:
+            if self.states[code] == state:
+                return code
+        return codes[0]
+
+    def resolve(self, name, state=None):
+        """
+        Resolve one district name.
+
+        Args:
+        - name (str): District name.
+        - state (str, optional): State of the row, which limits fuzzy candidates. Defaults to None (no fuzzy matching).
+
+        Returns:
+        - tuple: (code, match kind), with code -1 and kind 'unmatched' when no district is close enough.
+        """
+        if not isinstance(name, str):
+            return -1, 'unmatched'
+        state = state.lower() if isinstance(state, str) else None
+        if (name, state) in self.resolved:
+            return self.resolved[(name, state)]
+
+        key = normalize_district(name)
+        alias = self.aliases.get(key)
+        if name in self.exact:
+            result = (self._pick(self.exact[name], state), 'exact')
+        elif key in self.keys:
+            result = (self._pick(self.keys[key], state), 'normalized')
+        elif alias in self.keys:
+            result = (self._pick(self.keys[alias], state), 'alias')
+        else:
+            result = self._fuzzy(key, state)
+        self.resolved[(name, state)] = result
+        return result
+
+    def _fuzzy(self, key, state):
+        """
+        Find the closest key among the districts of the row's state by trigram overlap followed by edit similarity.
+        """
+        if not key or state is None:
+            return -1, 'unmatched'
+        overlap = Counter()
+        for gram in trigrams(key):
+            overlap.update(code for code in self.postings.get(gram, ()) if self.states[code] == state)
+
+        ratios = {}
+        for code, _ in overlap.most_common(self.max_candidates):
+            candidate = self.key_names[code]
+            if candidate not in ratios:
+                ratios[candidate] = (SequenceMatcher(None, key, candidate).ratio(), code)
+        ranked = sorted(ratios.values(), reverse=True)
+        if not ranked or ranked[0][0] < self.min_similarity:
+            return -1, 'unmatched'
+        if len(ranked) > 1 and ranked[0][0] - ranked[1][0] < self.min_margin:
+            return -1, 'unmatched'
+        return ranked[0][1], 'fuzzy'
+
+    def resolve_many(self, names, states=None):
+        """
+        Resolve a column of district names to codes, resolving each distinct (name, state) pair once.
+
+        Args:
+        - names (array-like): District names; missing values resolve to -1.
+        - states (array-like, optional): State of each row. Defaults to None (no fuzzy matching).
+
+        Returns:
+        - numpy.ndarray: int64 codes, -1 where unmatched.
+        """
+        pairs = pd.DataFrame({'name': np.asarray(names, dtype=object),
+                              'state': np.asarray(states, dtype=object) if states is not None else None})
+        # Groups are numbered in order of first appearance, as drop_duplicates keeps them
+        pair_codes = pairs.groupby(['name', 'state'], dropna=False, sort=False).ngroup().to_numpy()
+        resolved = [self.resolve(name, state) for name, state in pairs.drop_duplicates().itertuples(index=False)]
+
+        unique_codes = np.array([code for code, _ in resolved], dtype=np.int64)
+        rows = np.bincount(pair_codes, minlength=len(resolved))
+        for (_, kind), count in zip(resolved, rows):
+            self.counts[kind] += int(count)
+        return unique_codes[pair_codes]
+
+    def reset_counts(self):
+        """
+        Start counting match kinds afresh, e.g. for a new chunk. The memo of resolved names is kept.
+        """
+        self.counts = Counter()
+
+    def match_rates(self):
+        """
+        Share of resolved rows per match kind since the last reset_counts.
+
+        Returns:
+        - dict: Match kind to share of rows, plus 'rows' with the total.
+        """
+        total = sum(self.counts.values())
+        rates = {kind: (self.counts[kind] / total if total else 0.0) for kind in self.KINDS}
+        rates['rows'] = total
+        return rates
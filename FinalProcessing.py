@@ -1,19 +1,261 @@
 import pandas as pd
-from sklearn.preprocessing import OneHotEncoder
+import numpy as np
+import scipy.sparse
+import ast
 import re
 import pickle
 import json
+import os
+
+def parse_skill_list(text):
+    """
+    Parse the string form a skill list gets in a CSV, e.g. "['sales', \"women's wear\", nan]".
+
+    Args:
+    - text (str): Python representation of a list of skills.
+
+    Returns:
+    - list: Skills, without the missing (nan) entries. Empty if the text is not a list.
+    """
+    node = ast.parse(text, mode="eval").body
+    if not isinstance(node, (ast.List, ast.Tuple)):
+        return []
+    # nan is a bare name, which literal_eval rejects
+    return [ast.literal_eval(element) for element in node.elts if not isinstance(element, ast.Name)]
+
+def feature_name(column):
+    """
+    Make a column name compatible with the model's feature names.
+
+    Args:
+    - column (str): Column name.
+
+    Returns:
+    - str: Name with every run of non-word characters replaced by '_'.
+    """
+    return re.sub(r'\W+', '_', column)
+
+class FeatureSchema:
+    """
+    Feature columns and dtypes the model was trained with, loaded once.
+
+    Args:
+    - features_file (str, optional): Pickled list of feature columns. Defaults to 'features.pkl'.
+    - column_info_file (str, optional): JSON mapping of feature column to dtype. Defaults to 'column_info.json'.
+
+    Attributes:
+    - features (list): Feature columns in model order.
+    - column_info (dict): Feature column to dtype name.
+    - feature_positions (dict): Feature column to its position in features.
+    """
+
+    def __init__(self, features_file="features.pkl", column_info_file="column_info.json"):
+        with open(features_file, "rb") as f:
+            self.features = list(pickle.load(f))
+        self.feature_positions = {col: j for j, col in enumerate(self.features)}
+
+        with open(column_info_file, "r") as f:
+            self.column_info = json.load(f)
+
+    def conform(self, df):
+        """
+        Add the feature columns missing from a DataFrame as zeros and cast all feature columns to their dtypes.
+
+        Args:
+        - df (pandas.DataFrame): Encoded DataFrame.
+
+        Returns:
+        - pandas.DataFrame: DataFrame with every feature column, in one block per step instead of column by column.
+        """
+        missing_columns = [col for col in self.features if col not in df.columns]
+        if missing_columns:
+            zeros = pd.DataFrame(np.zeros((len(df), len(missing_columns)), dtype=np.int64),
+                                 columns=missing_columns, index=df.index)
+            df = pd.concat([df, zeros], axis=1)
+        return df.astype(self.column_info)
+
+    @classmethod
+    def for_model(cls, model=None, sparse=False, features_file="features.pkl", column_info_file="column_info.json"):
+        """
+        Load the feature schema in the column order a model was fit with.
+
+        A model fit on a DataFrame stores its column order as booster feature names, which need not be the
+        order of features.pkl. Models fit on an array (the pipeline's own) and TreeModel have no names and
+        keep features.pkl order, as does the sparse path, whose skill columns follow the features.
+
+        Args:
+        - model (object, optional): Loaded model, or None when training. Defaults to None.
+        - sparse (bool, optional): Whether the model scores the sparse feature matrix. Defaults to False.
+        - features_file (str, optional): Pickled list of feature columns. Defaults to 'features.pkl'.
+        - column_info_file (str, optional): JSON mapping of feature column to dtype. Defaults to 'column_info.json'.
+
+        Returns:
+        - FeatureSchema: Feature schema.
+        """
+        schema = cls(features_file, column_info_file)
+        feature_names = model.get_booster().feature_names if hasattr(model, 'get_booster') else None
+        if feature_names and not sparse:
+            schema.align(feature_names)
+        return schema
+
+    def align(self, names):
+        """
+        Order the features as a model was fit with them, e.g. the feature_names a booster fit on a DataFrame stores.
+
+        Args:
+        - names (list): Feature names in model order.
+
+        Raises:
+        - ValueError: If the names are not the same columns as the features.
+        """
+        if set(names) != set(self.features):
+            raise ValueError("The model's feature names do not match the columns of features.pkl")
+        self.features = list(names)
+        self.feature_positions = {col: j for j, col in enumerate(self.features)}
+
+    def positions(self, names):
+        """
+        Look up the matrix column of each feature name.
+
+        Args:
+        - names (iterable): Feature names.
+
+        Returns:
+        - numpy.ndarray: Column of each name in features order, -1 for names that are not features.
+        """
+        return np.array([self.feature_positions.get(name, -1) for name in names], dtype=np.int64)
+
+    def to_matrix(self, df, dtype=np.float32):
+        """
+        Build the feature matrix in features order with a single allocation.
+
+        Args:
+        - df (pandas.DataFrame): DataFrame holding the feature columns; missing ones are filled with 0.
+        - dtype (numpy.dtype, optional): Matrix dtype. Defaults to float32, the precision xgboost predicts with.
+
+        Returns:
+        - numpy.ndarray: C-contiguous matrix of shape (rows, features), ready for predict_proba.
+        """
+        matrix = np.zeros((len(df), len(self.features)), dtype=dtype)
+        for j, col in enumerate(self.features):
+            if col in df.columns:
+                matrix[:, j] = df[col].to_numpy(dtype=dtype)
+        return matrix
+
+class SkillVocabulary:
+    """
+    Fixed skill vocabulary of the bag-of-skills features, persisted so training and inference use the same columns.
+
+    Args:
+    - skills (iterable): Skill names in column order.
+
+    Attributes:
+    - skills (list): Skill names (lowercase) in column order.
+    - skill_positions (dict): Skill name to its column.
+    """
+
+    def __init__(self, skills):
+        self.skills = list(dict.fromkeys(str(skill).lower() for skill in skills))
+        self.skill_positions = {skill: j for j, skill in enumerate(self.skills)}
+
+    @classmethod
+    def build(cls, skills_file="rx_skills.csv"):
+        """
+        Build the vocabulary from the skills file. Done at training time; inference loads the saved one.
+
+        Args:
+        - skills_file (str, optional): Skills CSV with a 'skill_name' column. Defaults to 'rx_skills.csv'.
+
+        Returns:
+        - SkillVocabulary: Skill vocabulary.
+        """
+        return cls(pd.read_csv(skills_file)["skill_name"].dropna())
+
+    @classmethod
+    def load(cls, vocabulary_file="skill_vocabulary.pkl"):
+        """
+        Load the vocabulary saved when the model was trained.
+
+        Args:
+        - vocabulary_file (str, optional): Pickled skill list, kept alongside features.pkl. Defaults to 'skill_vocabulary.pkl'.
+
+        Returns:
+        - SkillVocabulary: Skill vocabulary.
+
+        Raises:
+        - FileNotFoundError: If there is no saved vocabulary, i.e. no model was trained with --sparse here.
+        """
+        if not os.path.exists(vocabulary_file):
+            raise FileNotFoundError(f"{vocabulary_file} not found; it is written when training with --sparse "
+                                    f"and must be kept alongside features.pkl")
+        with open(vocabulary_file, "rb") as f:
+            return cls(pickle.load(f))
+
+    def save(self, vocabulary_file="skill_vocabulary.pkl"):
+        """
+        Save the vocabulary alongside features.pkl, so inference uses the skill columns the model was trained with.
+
+        Args:
+        - vocabulary_file (str, optional): Path of the pickled skill list. Defaults to 'skill_vocabulary.pkl'.
+        """
+        with open(vocabulary_file, "wb") as f:
+            pickle.dump(self.skills, f)
+
+    def feature_names(self):
+        """
+        Get the feature name of each skill column.
+
+        Returns:
+        - list: 'Skill_<skill>' names in column order.
+        """
+        return [feature_name(f'Skill_{skill}') for skill in self.skills]
+
+    def matrix(self, skill_lists):
+        """
+        Build the candidate x skill matrix, storing only the skills each candidate has.
+
+        Args:
+        - skill_lists (iterable): Per candidate the skills found, as a list or array, its string form
+          from a CSV (e.g. "['sales', nan]"), or missing.
+
+        Returns:
+        - scipy.sparse.csr_matrix: float32 matrix of 0/1 flags, shape (candidates, len(skills)).
+          Skills outside the vocabulary are ignored.
+        """
+        indptr, indices = [0], []
+        for found in skill_lists:
+            if isinstance(found, str):
+                found = parse_skill_list(found)
+            elif found is None or (np.ndim(found) == 0 and pd.isna(found)):
+                found = []
+            columns = {self.skill_positions.get(str(skill).lower(), -1) for skill in found}
+            columns.discard(-1)
+            indices.extend(sorted(columns))
+            indptr.append(len(indices))
+
+        return scipy.sparse.csr_matrix((np.ones(len(indices), dtype=np.float32), np.array(indices, dtype=np.int64),
+                                        np.array(indptr, dtype=np.int64)), shape=(len(indptr) - 1, len(self.skills)))
 
 class Preprocessor:
     """
     Class to preprocess data for machine learning models.
 
+    Args:
+    - schema (FeatureSchema, optional): Feature schema. Defaults to one loaded from 'features.pkl' and 'column_info.json' on first use.
+    - skill_vocabulary (SkillVocabulary, optional): Vocabulary of the bag-of-skills features of the sparse path.
+      Defaults to the one saved as 'skill_vocabulary.pkl' at training time, loaded on first use.
+
     Attributes:
     - value_mapping (dict): Mapping of values to be replaced in the 'Previous_Organizations' column.
     - states (list): List of Indian states.
+    - encoded_columns (list): Categorical columns that are one-hot encoded.
+    - schema (FeatureSchema): Feature schema, loaded once.
+    - skill_vocabulary (SkillVocabulary): Skill vocabulary, loaded once.
     """
 
-    def __init__(self):
+    def __init__(self, schema=None, skill_vocabulary=None):
+        self.schema = schema
+        self.skill_vocabulary = skill_vocabulary
         self.value_mapping = {
             'a': 6,  # Example: 10 lakhs
         }
@@ -23,17 +265,54 @@ class Preprocessor:
                        'maharashtra', 'odisha', 'puducherry', 'punjab', 'rajasthan', 'tamil nadu', 'telangana', 'unknown',
                        'uttar pradesh', 'uttarakhand', 'west bengal']
 
-    def preprocess(self, df):
+        self.encoded_columns = ['Industry', 'Source', 'Department', 'R_Region', 'B_Region']
+
+    def get_schema(self):
         """
-        Preprocesses the input DataFrame for machine learning.
+        Get the feature schema, loading it on first use.
+
+        Returns:
+        - FeatureSchema: Feature schema.
+        """
+        if self.schema is None:
+            self.schema = FeatureSchema()
+        return self.schema
+
+    def get_skill_vocabulary(self):
+        """
+        Get the skill vocabulary, loading it on first use.
+
+        Returns:
+        - SkillVocabulary: Skill vocabulary.
+        """
+        if self.skill_vocabulary is None:
+            self.skill_vocabulary = SkillVocabulary.load()
+        return self.skill_vocabulary
+
+    def sparse_feature_names(self):
+        """
+        Get the column names of the sparse feature matrix.
+
+        Returns:
+        - list: features.pkl columns followed by the bag-of-skills columns.
+        """
+        return self.get_schema().features + self.get_skill_vocabulary().feature_names()
+
+    def clean(self, df):
+        """
+        Map and drop columns ahead of encoding, shared by the dense and sparse paths.
 
         Args:
         - df (pandas.DataFrame): Input DataFrame.
 
         Returns:
-        - pandas.DataFrame: Preprocessed DataFrame.
+        - pandas.DataFrame: DataFrame with the columns still to be encoded.
         """
 
+        # Decode categorical columns from the compaction stage so the mappings below see plain values
+        categorical_columns = df.columns[df.dtypes == 'category']
+        df[categorical_columns] = df[categorical_columns].astype(object)
+
         # Replace values in 'Previous_Organizations' column
         df['Previous_Organizations'] = df['Previous_Organizations'].replace(self.value_mapping)
 
@@ -48,36 +327,108 @@ class Preprocessor:
         # Set 'Previous_Organizations' as type int, treating NaN as 0
         df['Previous_Organizations'] = df['Previous_Organizations'].fillna(0).astype(int)
 
+        return df
+
+    def state_indicators(self, df):
+        """
+        Flag, for every state, the rows whose residential or branch state it is.
+
+        Args:
+        - df (pandas.DataFrame): Cleaned DataFrame with 'R_State' and 'B_State'.
+
+        Returns:
+        - numpy.ndarray: (rows, len(states)) int64 matrix of 0/1 flags in states order.
+        """
+        states = np.array(self.states, dtype=object)
+        residential = df['R_State'].to_numpy(dtype=object)[:, None]
+        branch = df['B_State'].to_numpy(dtype=object)[:, None]
+        return ((residential == states) | (branch == states)).astype(np.int64)
+
+    def preprocess(self, df):
+        """
+        Preprocesses the input DataFrame for machine learning.
+
+        Args:
+        - df (pandas.DataFrame): Input DataFrame.
+
+        Returns:
+        - pandas.DataFrame: Preprocessed DataFrame.
+        """
+        df = self.clean(df)
+
         # One-hot encoding for categorical variables
-        columns_to_encode = ['Industry', 'Source', 'Department', 'R_Region', 'B_Region']
-        df_encoded = pd.get_dummies(df, columns=columns_to_encode)
+        df_encoded = pd.get_dummies(df, columns=self.encoded_columns)
 
-        # Create indicator variables for states
-        for state in self.states:
-            df_encoded[state] = ((df['R_State'] == state) | (df['B_State'] == state)).astype(int)
+        # Create indicator variables for states, all at once
+        indicators = self.state_indicators(df)
+        df_encoded = pd.concat([df_encoded, pd.DataFrame(indicators, columns=self.states, index=df_encoded.index)], axis=1)
 
         # Drop 'R_State' and 'B_State'
         df_encoded.drop(columns=['R_State', 'B_State'], inplace=True)
 
         # Modify column names to ensure compatibility
-        df_encoded.columns = [re.sub(r'\W+', '_', col) for col in df_encoded.columns]
+        df_encoded.columns = [feature_name(col) for col in df_encoded.columns]
+
+        # Add missing feature columns and convert to the trained data types
+        return self.get_schema().conform(df_encoded)
+
+    def sparse_matrix(self, df):
+        """
+        Preprocess a DataFrame straight into a CSR feature matrix, without densifying the one-hot columns,
+        with one bag-of-skills column per vocabulary skill after the features.pkl columns.
+        Only nonzero cells are stored. XGBoost treats unstored cells as missing rather than 0, so a model
+        used on this matrix must have been trained on it as well (python main.py --sparse).
+
+        Args:
+        - df (pandas.DataFrame): Input DataFrame.
 
-        # Load features from pickle file
-        with open("features.pkl", "rb") as f:
-            features = pickle.load(f)
+        Returns:
+        - scipy.sparse.csr_matrix: float32 matrix with the columns of sparse_feature_names.
+        """
+        schema = self.get_schema()
+        skills = self.get_skill_vocabulary().matrix(df['Skill'])
+        df = self.clean(df)
+        rows, cols = [], []
 
-        # Get missing columns
-        missing_columns = list(set(features) - set(df_encoded.columns))
+        # One-hot columns: one entry per row, at the column of its category
+        for column in self.encoded_columns:
+            codes, uniques = pd.factorize(df[column])
+            positions = np.append(schema.positions([feature_name(f'{column}_{value}') for value in uniques]), -1)[codes]
+            known = positions >= 0
+            rows.append(np.flatnonzero(known))
+            cols.append(positions[known])
 
-        # Fill missing columns with zeros
-        df_encoded[missing_columns] = 0
+        # State indicators
+        state_rows, state_cols = np.nonzero(self.state_indicators(df))
+        positions = schema.positions([feature_name(state) for state in self.states])[state_cols]
+        rows.append(state_rows[positions >= 0])
+        cols.append(positions[positions >= 0])
+        ones = sum(len(r) for r in rows)
 
-        # Load column info from JSON file
-        with open("column_info.json", "r") as f:
-            column_info = json.load(f)
+        # Remaining numeric columns (product and language flags, counts, demographics): their nonzero cells
+        numeric = df.drop(columns=self.encoded_columns + ['R_State', 'B_State'])
+        values = [np.ones(ones, dtype=np.float32)]
+        for column, position in zip(numeric.columns, schema.positions(feature_name(col) for col in numeric.columns)):
+            if position < 0:
+                continue
+            column_values = numeric[column].to_numpy(dtype=np.float32)
+            nonzero = np.flatnonzero(column_values != 0)
+            rows.append(nonzero)
+            cols.append(np.full(len(nonzero), position, dtype=np.int64))
+            values.append(column_values[nonzero])
 
-        # Convert columns to specified data types
-        for col, dtype in column_info.items():
-            df_encoded[col] = df_encoded[col].astype(dtype)
+        features = scipy.sparse.csr_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))),
+                                           shape=(len(df), len(schema.features)), dtype=np.float32)
+        return scipy.sparse.hstack([features, skills], format='csr', dtype=np.float32)
 
-        return df_encoded
+    def feature_matrix(self, df):
+        """
+        Preprocess a DataFrame into the float32 feature matrix the model predicts on.
+
+        Args:
+        - df (pandas.DataFrame): Input DataFrame.
+
+        Returns:
+        - numpy.ndarray: Feature matrix in features.pkl column order.
+        """
+        return self.get_schema().to_matrix(self.preprocess(df))
@@ -0,0 +1,143 @@
+import sqlite3
+import threading
+import time
+
+
+class GeocodeCache:
+    """
+    Persistent SQLite cache of pincode geocoding results.
+
+    Entries expire after a TTL and the least recently used entries are evicted once the cache
+    grows beyond max_entries. Pincodes the geocoder could not resolve are cached as negative
+    entries with their own (usually shorter) TTL, so they are not retried on every run.
+
+    Args:
+    - cache_path (str, optional): Path of the SQLite database. Defaults to 'geocode_cache.sqlite'.
+    - ttl (float, optional): Lifetime of resolved entries in seconds. Defaults to 30 days.
+    - negative_ttl (float, optional): Lifetime of unresolved entries in seconds. Defaults to 1 day.
+    - max_entries (int, optional): Maximum number of entries kept. Defaults to 100000.
+    - clock (callable, optional): Function returning the current time in seconds. Defaults to time.time.
+
+    Attributes:
+    - hits (int): Lookups answered with coordinates.
+    - negative_hits (int): Lookups answered with a cached failure.
+    - misses (int): Lookups not in the cache or expired.
+    """
+
+    def __init__(self, cache_path='geocode_cache.sqlite', ttl=30 * 24 * 3600, negative_ttl=24 * 3600,
+                 max_entries=100000, clock=time.time):
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+        # One connection shared by all threads; the lock serializes access to it
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(cache_path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS geocodes ("
+            "pincode TEXT PRIMARY KEY, latitude REAL, longitude REAL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS geocodes_accessed_at ON geocodes (accessed_at)")
+        self.connection.commit()
+
+    def get(self, pincode):
+        """
+        Look up a pincode in the cache.
+
+        Args:
+        - pincode (str): The pincode to look up.
+
+        Returns:
+        - tuple: (found, coords). found is False on a miss; coords is (latitude, longitude),
+          or None for a cached failure.
+        """
+        now = self.clock()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT latitude, longitude, created_at FROM geocodes WHERE pincode = ?", (str(pincode),)
+            ).fetchone()
+
+            if row is not None:
+                latitude, longitude, created_at = row
+                ttl = self.negative_ttl if latitude is None else self.ttl
+                if now - created_at <= ttl:
+                    self.connection.execute(
+                        "UPDATE geocodes SET accessed_at = ? WHERE pincode = ?", (now, str(pincode))
+                    )
+                    self.connection.commit()
+                    if latitude is None:
+                        self.negative_hits += 1
+                        return True, None
+                    self.hits += 1
+                    return True, (latitude, longitude)
+
+            self.misses += 1
+            return False, None
+
+    def put(self, pincode, coords):
+        """
+        Store the geocoding result for a pincode, evicting least recently used entries if needed.
+
+        Args:
+        - pincode (str): The pincode that was geocoded.
+        - coords (tuple or None): (latitude, longitude), or None if the geocoder could not resolve it.
+        """
+        now = self.clock()
+        latitude, longitude = coords if coords else (None, None)
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO geocodes (pincode, latitude, longitude, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)", (str(pincode), latitude, longitude, now, now)
+            )
+            self.connection.execute(
+                "DELETE FROM geocodes WHERE pincode IN ("
+                "SELECT pincode FROM geocodes ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,)
+            )
+            self.connection.commit()
+
+    def purge_expired(self):
+        """
+        Delete all expired entries.
+
+        Returns:
+        - int: Number of entries deleted.
+        """
+        now = self.clock()
+        with self.lock:
+            cursor = self.connection.execute(
+                "DELETE FROM geocodes WHERE (latitude IS NOT NULL AND created_at < ?) "
+                "OR (latitude IS NULL AND created_at < ?)", (now - self.ttl, now - self.negative_ttl)
+            )
+            self.connection.commit()
+            return cursor.rowcount
+
+    def stats(self):
+        """
+        Get cache counters.
+
+        Returns:
+        - dict: Number of entries, hits, negative hits, misses and hit rate.
+        """
+        with self.lock:
+            entries = self.connection.execute("SELECT COUNT(*) FROM geocodes").fetchone()[0]
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        """
+        Close the underlying database connection.
+        """
+        with self.lock:
+            self.connection.close()
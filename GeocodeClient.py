@@ -0,0 +1,153 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from geopy.geocoders import Nominatim
+from geopy.exc import GeocoderRateLimited, GeocoderTimedOut, GeocoderUnavailable
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces calls evenly to at most `rate` per second across all threads.
+
+    Args:
+    - rate (float): Maximum number of calls per second.
+    - clock (callable, optional): Monotonic clock in seconds. Defaults to time.monotonic.
+    - sleep (callable, optional): Function used to wait. Defaults to time.sleep.
+    """
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 1.0 / rate
+        self.clock = clock
+        self.sleep = sleep
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until the caller may make its call.
+        """
+        with self.lock:
+            now = self.clock()
+            wait = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait > 0:
+            self.sleep(wait)
+
+
+class GeocodingClient:
+    """
+    Concurrent, rate-limited geocoding client for pincodes.
+
+    Requests run on a bounded thread pool and share one global rate limit, so a cold run is bounded
+    by the rate limit instead of by request latency. Timeouts, unavailability and rate limiting are
+    retried with exponential backoff, and concurrent requests for the same pincode share one call.
+
+    Args:
+    - geocoder (object, optional): Geocoder with a geopy-style geocode(query) method. Defaults to Nominatim on `domain`.
+    - domain (str, optional): Nominatim host, e.g. 'localhost:8080' for a local stand-in. Defaults to 'nominatim.openstreetmap.org'.
+    - scheme (str, optional): 'https' or 'http'. Defaults to 'https'.
+    - requests_per_second (float, optional): Global request rate limit. Defaults to 1 (the public Nominatim policy).
+    - max_workers (int, optional): Maximum number of concurrent requests. Defaults to 4.
+    - max_retries (int, optional): Retries after the first attempt for retryable errors. Defaults to 3.
+    - backoff (float, optional): Initial backoff in seconds, doubled on each retry. Defaults to 1.
+    - timeout (float, optional): Per-request timeout in seconds for the default geocoder. Defaults to 10.
+
+    Attributes:
+    - errors (dict): Mapping of pincode to the last error for pincodes that could not be geocoded.
+    """
+
+    RETRYABLE_ERRORS = (GeocoderTimedOut, GeocoderUnavailable, GeocoderRateLimited)
+
+    def __init__(self, geocoder=None, domain='nominatim.openstreetmap.org', scheme='https', requests_per_second=1.0,
+                 max_workers=4, max_retries=3, backoff=1.0, timeout=10):
+        if geocoder is None:
+            geocoder = Nominatim(user_agent="pincode_locator", domain=domain, scheme=scheme, timeout=timeout)
+        self.geocoder = geocoder
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.in_flight = {}
+        # Re-entrant: a future that is already done runs its done-callback inside submit
+        self.lock = threading.RLock()
+        self.errors = {}
+
+    def _geocode_with_retries(self, pincode):
+        """
+        Geocode one pincode, retrying retryable errors with exponential backoff.
+
+        Args:
+        - pincode (str): The pincode to geocode.
+
+        Returns:
+        - tuple or None: (latitude, longitude), or None if not found or if every attempt failed.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                location = self.geocoder.geocode(pincode + ", India")
+                self.errors.pop(pincode, None)
+                return (location.latitude, location.longitude) if location else None
+            except self.RETRYABLE_ERRORS as e:
+                self.errors[pincode] = e
+                if attempt < self.max_retries:
+                    delay = self.backoff * 2 ** attempt
+                    retry_after = getattr(e, 'retry_after', None)
+                    time.sleep(max(delay, retry_after or 0))
+            except Exception as e:
+                self.errors[pincode] = e
+                return None
+        return None
+
+    def submit(self, pincode):
+        """
+        Schedule a pincode for geocoding, reusing the in-flight request if there is one.
+
+        Args:
+        - pincode (str): The pincode to geocode.
+
+        Returns:
+        - concurrent.futures.Future: Future resolving to (latitude, longitude) or None.
+        """
+        with self.lock:
+            future = self.in_flight.get(pincode)
+            if future is None:
+                future = self.executor.submit(self._geocode_with_retries, pincode)
+                self.in_flight[pincode] = future
+                future.add_done_callback(lambda _: self._forget(pincode))
+            return future
+
+    def _forget(self, pincode):
+        with self.lock:
+            self.in_flight.pop(pincode, None)
+
+    def geocode(self, pincode):
+        """
+        Geocode a single pincode, blocking until the result is available.
+
+        Args:
+        - pincode (str): The pincode to geocode.
+
+        Returns:
+        - tuple or None: (latitude, longitude), or None if it could not be geocoded.
+        """
+        return self.submit(pincode).result()
+
+    def geocode_many(self, pincodes):
+        """
+        Geocode many pincodes concurrently.
+
+        Args:
+        - pincodes (iterable): Pincodes to geocode; duplicates are geocoded once.
+
+        Returns:
+        - dict: Mapping of pincode to (latitude, longitude) or None.
+        """
+        futures = {pincode: self.submit(pincode) for pincode in dict.fromkeys(pincodes)}
+        return {pincode: future.result() for pincode, future in futures.items()}
+
+    def close(self):
+        """
+        Wait for pending requests and shut down the worker threads.
+        """
+        self.executor.shutdown(wait=True)
@@ -27,22 +27,17 @@ class InitialProcessor:
         Args:
         df (DataFrame): The DataFrame containing the data to be processed.
         """
-        def lowercase_str(x):
-            """
-            Converts string values to lowercase.
-
-            Args:
-            x: Value to be converted.
-
-            Returns:
-            Converted lowercase string or original value if not a string.
-            """
-            if isinstance(x, str):
-                return x.lower()
-            else:
-                return x
-        # Apply the function element-wise to the entire DataFrame
-        df = df.applymap(lowercase_str)
+        df = df.copy()
+        # Lowercase the string values of object columns, leaving any other values untouched
+        for col in df.columns[df.dtypes == object]:
+            values = df[col]
+            try:
+                lowered = values.str.lower()
+            except AttributeError:
+                # No string values in this column
+                continue
+            # .str gives NaN for non-string values; keep the originals there
+            df[col] = lowered.where(lowered.notna(), values)
         self.df = df
 
     def rename_columns(self):
@@ -88,26 +83,17 @@ class InitialProcessor:
                     'car loan / used car loan',
                     'unsecure business loan']
         
-        # Function to set value to 1 if the column name is present in Products else 0
-        def set_value(column_name, products):
-            """
-            Sets value to 1 if the column name is present in 'Products', else 0.
-
-            Args:
-            column_name (str): The name of the column.
-            products (str): String containing products.
-
-            Returns:
-            1 if column name is present in products, else 0.
-            """
-            if pd.notna(products) and column_name in products:
-                return 1
-            else:
-                return 0
+        # Match each distinct Products value once, then gather the rows of the multi-hot matrix
+        codes, uniques = pd.factorize(self.df['Products'])
+        multi_hot = np.zeros((len(uniques) + 1, len(columns_to_add)), dtype=np.int64)
+        for i, products in enumerate(uniques):
+            multi_hot[i] = [column_name in products for column_name in columns_to_add]
+        # Missing Products (code -1) select the all-zero last row
+        multi_hot = multi_hot[codes]
 
         # Create new columns based on the list of column names and set their values
-        for column_name in columns_to_add:
-            self.df[column_name] = self.df['Products'].apply(lambda x: set_value(column_name, x))
+        for j, column_name in enumerate(columns_to_add):
+            self.df[column_name] = multi_hot[:, j]
         
         # Drop the Products column
         self.df = self.df.drop(columns=['Products'])
@@ -197,20 +183,26 @@ class InitialProcessor:
         Reduces 'Earning_Members' values to single digits.
         """
 
-        def take_first_digit(x):
-            """
-            Returns the first digit of a number.
-
-            Args:
-            x: The number.
-
-            Returns:
-            The first digit of the number.
-            """
-            if float(x) > 10:
-                return int(str(x)[0])
-            else:
-                return float(x)
-
-        # Apply the custom function to the 'Numbers' column
-        self.df['Earning_Members'] = self.df['Earning_Members'].apply(take_first_digit)
+        values = self.df['Earning_Members']
+        if values.empty:
+            return
+        numbers = values.astype(float)
+        large = (numbers > 10).to_numpy()
+
+        # Values above 10 keep only their first digit
+        if values.dtype == object:
+            first_digits = values[large].astype(str).str[0].astype(int).to_numpy()
+        else:
+            large_numbers = numbers.to_numpy()[large]
+            exponent = np.floor(np.log10(large_numbers))
+            # Correct log10 rounding next to powers of ten
+            exponent -= large_numbers < 10 ** exponent
+            exponent += large_numbers >= 10 ** (exponent + 1)
+            first_digits = np.floor(large_numbers / 10 ** exponent)
+
+        result = numbers.to_numpy().copy()
+        result[large] = first_digits
+        # Like Series.apply, an all-integer result becomes an integer column
+        if large.all():
+            result = result.astype(np.int64)
+        self.df['Earning_Members'] = pd.Series(result, index=values.index)
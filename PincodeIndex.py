@@ -0,0 +1,186 @@
+import os
+import numpy as np
+import pandas as pd
+import indiapins
+
+
+def load_pincode_records():
+    """
+    Load every post office record bundled with indiapins.
+
+    Returns:
+    - pandas.DataFrame: One row per post office with 'Pincode', 'District', 'Region', 'State', 'Latitude' and 'Longitude' columns.
+    """
+    # indiapins keeps its whole table in memory; reuse it instead of scanning it once per pincode.
+    # _zips is private, so requirements.txt pins the indiapins version it was checked against.
+    records = pd.DataFrame(indiapins.core._zips)
+    records['Pincode'] = pd.to_numeric(records['Pincode'], errors='coerce')
+    records['Latitude'] = pd.to_numeric(records['Latitude'], errors='coerce')
+    records['Longitude'] = pd.to_numeric(records['Longitude'], errors='coerce')
+    return records.dropna(subset=['Pincode'])
+
+
+def to_pincode_array(pincodes):
+    """
+    Convert pincodes given as strings, ints, floats or None into an integer array.
+
+    Args:
+    - pincodes (array-like): Pincodes to convert.
+
+    Returns:
+    - numpy.ndarray: int64 array of pincodes, with -1 for missing or malformed values.
+    """
+    values = pd.to_numeric(pd.Series(pincodes, dtype=object), errors='coerce').to_numpy(dtype=float)
+    valid = np.isfinite(values) & (values >= PincodeGeoIndex.MIN_PINCODE) & (values <= PincodeGeoIndex.MAX_PINCODE)
+    return np.where(valid, values, -1).astype(np.int64)
+
+
+class PincodeGeoIndex:
+    """
+    Offline pincode to (latitude, longitude) index.
+
+    The index is a direct-address float32 table holding one row per possible 6-digit pincode,
+    so a lookup is a single array read. It is built once from the post office table bundled
+    with indiapins, saved as a .npy file and memory-mapped on later runs.
+
+    Args:
+    - index_path (str, optional): Path of the .npy file backing the index. Defaults to 'pincode_coords.npy'.
+
+    Attributes:
+    - index_path (str): Path of the .npy file backing the index.
+    - coords (numpy.ndarray): (MAX_PINCODE - MIN_PINCODE + 1, 2) array of coordinates, NaN where unknown.
+    """
+
+    MIN_PINCODE = 100000
+    MAX_PINCODE = 999999
+
+    # Bounding box of India, used to drop placeholder coordinates such as (1.0, 1.0)
+    LATITUDE_RANGE = (6.0, 38.0)
+    LONGITUDE_RANGE = (68.0, 98.0)
+
+    def __init__(self, index_path='pincode_coords.npy'):
+        self.index_path = index_path
+        self.coords = None
+
+    def build(self):
+        """
+        Build the index from the bundled pincode table and save it to index_path.
+
+        The coordinate of a pincode is the median over its post offices, which keeps
+        a single mistyped office from moving the whole pincode.
+        """
+        records = load_pincode_records()
+        in_india = (records['Latitude'].between(*self.LATITUDE_RANGE) &
+                    records['Longitude'].between(*self.LONGITUDE_RANGE))
+        medians = records[in_india].groupby('Pincode')[['Latitude', 'Longitude']].median()
+
+        coords = np.full((self.MAX_PINCODE - self.MIN_PINCODE + 1, 2), np.nan, dtype=np.float32)
+        coords[medians.index.to_numpy(dtype=np.int64) - self.MIN_PINCODE] = medians.to_numpy(dtype=np.float32)
+
+        np.save(self.index_path, coords)
+        self.coords = coords
+
+    def load(self):
+        """
+        Memory-map the index from index_path, building it first if the file does not exist.
+        """
+        if not os.path.exists(self.index_path):
+            self.build()
+        self.coords = np.load(self.index_path, mmap_mode='r')
+
+    def lookup(self, pincode):
+        """
+        Retrieve latitude and longitude coordinates for a single pincode.
+
+        Args:
+        - pincode (str or int): The pincode to look up.
+
+        Returns:
+        - tuple or None: (latitude, longitude), or None if the pincode is not covered by the index.
+        """
+        latitude, longitude = self.lookup_many([pincode])[0]
+        if np.isnan(latitude):
+            return None
+        return float(latitude), float(longitude)
+
+    def lookup_many(self, pincodes):
+        """
+        Retrieve coordinates for many pincodes at once.
+
+        Args:
+        - pincodes (array-like): Pincodes as strings, ints or floats.
+
+        Returns:
+        - numpy.ndarray: (n, 2) float64 array of (latitude, longitude), NaN where the pincode is not covered.
+        """
+        if self.coords is None:
+            self.load()
+
+        pincodes = to_pincode_array(pincodes)
+        result = np.full((len(pincodes), 2), np.nan)
+        valid = pincodes >= 0
+        result[valid] = self.coords[pincodes[valid] - self.MIN_PINCODE]
+        return result
+
+
+class PincodeLookup:
+    """
+    Preloaded pincode to (district, region, state) table.
+
+    All records are loaded once into a sorted pincode array with aligned detail columns,
+    so single lookups are a dict access and batch lookups are one searchsorted call.
+    When a pincode has several post offices, the first one wins, as with indiapins.matching.
+
+    Attributes:
+    - pincodes (numpy.ndarray): Sorted int64 array of known pincodes.
+    - details (pandas.DataFrame): 'District', 'Region' and 'State' columns aligned with pincodes.
+    - positions (dict): Mapping of pincode to its row in details.
+    - records (list): details as a list of dicts, for scalar lookups.
+    """
+
+    COLUMNS = ['District', 'Region', 'State']
+
+    def __init__(self):
+        records = load_pincode_records().drop_duplicates(subset=['Pincode'], keep='first')
+        records = records.sort_values('Pincode')
+        self.pincodes = records['Pincode'].to_numpy(dtype=np.int64)
+        self.details = records[self.COLUMNS].reset_index(drop=True)
+        self.positions = {pincode: i for i, pincode in enumerate(self.pincodes.tolist())}
+        self.records = self.details.to_dict('records')
+
+    def lookup(self, pincode):
+        """
+        Retrieve details for a single pincode.
+
+        Args:
+        - pincode (str or int): The pincode to look up.
+
+        Returns:
+        - dict or None: {'District', 'Region', 'State'} for the pincode, or None if it is missing or unknown.
+        """
+        try:
+            position = self.positions.get(int(float(pincode)))
+        except (TypeError, ValueError):
+            return None
+        if position is None:
+            return None
+        return dict(self.records[position])
+
+    def lookup_many(self, pincodes):
+        """
+        Retrieve details for many pincodes at once.
+
+        Args:
+        - pincodes (array-like): Pincodes as strings, ints or floats.
+
+        Returns:
+        - pandas.DataFrame: 'District', 'Region' and 'State' columns in input order, None where the pincode is missing or unknown.
+        """
+        pincodes = to_pincode_array(pincodes)
+        positions = np.searchsorted(self.pincodes, pincodes).clip(max=len(self.pincodes) - 1)
+        found = self.pincodes[positions] == pincodes
+
+        return pd.DataFrame({
+            column: np.where(found, self.details[column].to_numpy(dtype=object)[positions], None)
+            for column in self.COLUMNS
+        })
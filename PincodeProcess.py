@@ -1,20 +1,71 @@
-import indiapins
 from geopy.geocoders import Nominatim
 from geopy.distance import geodesic
 import pandas as pd
 from tqdm import tqdm
 import numpy as np
+from PincodeIndex import PincodeGeoIndex, PincodeLookup
+
+# Mean Earth radius (IUGG), in kilometers
+EARTH_RADIUS_KM = 6371.0088
+
+
+def batch_distance(coords1, coords2, method='haversine'):
+    """
+    Calculate distances (in kilometers) between two arrays of coordinates in one call.
+
+    Parameters:
+        coords1 (array-like): (n, 2) array of (latitude, longitude) pairs, NaN where unknown.
+        coords2 (array-like): (n, 2) array of (latitude, longitude) pairs, NaN where unknown.
+        method (str): 'haversine' for the vectorized spherical formula, or 'geodesic' for the
+            precise ellipsoidal distance from geopy (one pair at a time, meant for audits).
+
+    Returns:
+        ndarray: Distances in kilometers, NaN where either coordinate is unknown.
+    """
+    coords1 = np.asarray(coords1, dtype=float).reshape(-1, 2)
+    coords2 = np.asarray(coords2, dtype=float).reshape(-1, 2)
+
+    if method == 'haversine':
+        lat1, lon1 = np.radians(coords1[:, 0]), np.radians(coords1[:, 1])
+        lat2, lon2 = np.radians(coords2[:, 0]), np.radians(coords2[:, 1])
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+    if method == 'geodesic':
+        distances = np.full(len(coords1), np.nan)
+        known = ~(np.isnan(coords1).any(axis=1) | np.isnan(coords2).any(axis=1))
+        for i in np.flatnonzero(known):
+            distances[i] = geodesic(coords1[i], coords2[i]).kilometers
+        return distances
+
+    raise ValueError(f"Unknown distance method: {method}")
+
 
 class PincodeDetailsExtractor:
     """
     A class to extract details and calculate distance between two pincodes in India.
     """
 
-    def __init__(self):
+    def __init__(self, geo_index=None, distance_method='haversine', pincode_lookup=None, geocoder=None, geocode_cache=None,
+                 geocoding_client=None):
         """
         Initialize PincodeDetailsExtractor class with an empty DataFrame.
+
+        Parameters:
+            geo_index (PincodeGeoIndex, optional): Offline coordinate index consulted before Nominatim. Defaults to a PincodeGeoIndex on 'pincode_coords.npy'.
+            distance_method (str, optional): Distance formula used by process_data_batch, 'haversine' or 'geodesic'. Defaults to 'haversine'.
+            pincode_lookup (PincodeLookup, optional): Preloaded pincode details table. Defaults to a new PincodeLookup, loaded here once.
+            geocoder (object, optional): Fallback geocoder with a geopy-style geocode(query) method. Defaults to Nominatim, created on first use.
+            geocode_cache (GeocodeCache, optional): Persistent cache of fallback geocoding results. Defaults to no cache.
+            geocoding_client (GeocodingClient, optional): Concurrent rate-limited client used instead of geocoder for cache misses. Defaults to None.
         """
         self.pincode_details_df = pd.DataFrame(columns=['R_District', 'R_Region', 'R_State', 'B_District', 'B_Region', 'B_State', 'Distance_Kilometers'])
+        self.geo_index = geo_index if geo_index is not None else PincodeGeoIndex()
+        self.pincode_lookup = pincode_lookup if pincode_lookup is not None else PincodeLookup()
+        self.distance_method = distance_method
+        self.geocoder = geocoder
+        self.geocode_cache = geocode_cache
+        self.geocoding_client = geocoding_client
 
     def get_pincode_details(self, pincode):
         """
@@ -26,19 +77,13 @@ class PincodeDetailsExtractor:
         Returns:
             dict or None: A dictionary containing details of the pincode, or None if details are not found.
         """
-        try:
-            details = indiapins.matching(pincode)
-            if details:
-                return details[0]  # Return the details of the first matching pincode
-            else:
-                return None
-        except Exception as e:
-            print(f"Error occurred while getting details for pincode {pincode}: {e}")
-            return None
+        return self.pincode_lookup.lookup(pincode)
 
     def get_coordinates(self, pincode):
         """
         Retrieve latitude and longitude coordinates for a given pincode.
+        The offline index is tried first, then the geocode cache; the geocoder is only queried for pincodes
+        neither covers. Unresolved pincodes are negative-cached, errors are not cached.
         
         Parameters:
             pincode (str): The pincode for which coordinates are to be retrieved.
@@ -46,17 +91,60 @@ class PincodeDetailsExtractor:
         Returns:
             tuple or None: A tuple containing latitude and longitude coordinates, or None if coordinates are not found.
         """
-        geolocator = Nominatim(user_agent="pincode_locator")
-        try:
-            location = geolocator.geocode(pincode + ", India")
-            if location:
-                return location.latitude, location.longitude
-            else:
-                return None
-        except Exception as e:
-            print(f"Error occurred while getting coordinates for pincode {pincode}: {e}")
+        if pincode is None:
             return None
 
+        coords = self.geo_index.lookup(pincode)
+        if coords:
+            return coords
+
+        return self.geocode_pincodes([pincode])[pincode]
+
+    def geocode_pincodes(self, pincodes):
+        """
+        Geocode pincodes that the offline index does not cover.
+        The geocode cache is checked first; the remaining pincodes go to the geocoding client concurrently
+        when one is configured, otherwise to the geocoder one at a time. Unresolved pincodes are
+        negative-cached, errors are not cached.
+        
+        Parameters:
+            pincodes (list): Pincode strings to geocode.
+        
+        Returns:
+            dict: Mapping of pincode to a (latitude, longitude) tuple, or None if coordinates are not found.
+        """
+        coordinates = {}
+        pending = []
+        for pincode in dict.fromkeys(pincodes):
+            if self.geocode_cache is not None:
+                found, coords = self.geocode_cache.get(pincode)
+                if found:
+                    coordinates[pincode] = coords
+                    continue
+            pending.append(pincode)
+
+        failed = set()
+        if self.geocoding_client is not None:
+            coordinates.update(self.geocoding_client.geocode_many(pending))
+            failed = set(pending) & set(self.geocoding_client.errors)
+        else:
+            if pending and self.geocoder is None:
+                self.geocoder = Nominatim(user_agent="pincode_locator")
+            for pincode in pending:
+                try:
+                    location = self.geocoder.geocode(pincode + ", India")
+                    coordinates[pincode] = (location.latitude, location.longitude) if location else None
+                except Exception as e:
+                    print(f"Error occurred while getting coordinates for pincode {pincode}: {e}")
+                    coordinates[pincode] = None
+                    failed.add(pincode)
+
+        if self.geocode_cache is not None:
+            for pincode in pending:
+                if pincode not in failed:
+                    self.geocode_cache.put(pincode, coordinates[pincode])
+        return coordinates
+
     def calculate_distance(self, pincode1, pincode2):
         """
         Calculate distance (in kilometers) between two pincodes.
@@ -125,6 +213,84 @@ class PincodeDetailsExtractor:
 
             self.pincode_details_df = pd.concat([self.pincode_details_df, pd.DataFrame([new_row])], ignore_index=True)
 
+    def _pincode_strings(self, values):
+        """
+        Convert a column of pincodes into strings the same way process_data does for a single row.
+
+        Parameters:
+            values (Series): Column of numeric pincodes, possibly containing NaN or 0.
+
+        Returns:
+            ndarray: Object array of pincode strings, with None where the pincode is missing.
+        """
+        values = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+        valid = np.isfinite(values) & (values != 0)
+        pincodes = np.full(len(values), None, dtype=object)
+        pincodes[valid] = values[valid].astype(np.int64).astype(str)
+        return pincodes
+
+    def process_data_batch(self, df):
+        """
+        Columnar equivalent of process_data.
+        Each unique pincode is looked up once and each unique residential/branch pair is measured once,
+        then the results are broadcast back to all rows, so the cost grows with the number of unique
+        pincodes instead of quadratically with the number of candidates.
+        
+        Parameters:
+            df (DataFrame): DataFrame containing columns 'R_Pincode', 'B_Pincode', and 'CandidateID'.
+        """
+        residential_pincodes = self._pincode_strings(df['R_Pincode'])
+        branch_pincodes = self._pincode_strings(df['B_Pincode'])
+
+        # Codes index into the unique pincodes; missing pincodes get code -1
+        pincode_codes, unique_pincodes = pd.factorize(np.concatenate([residential_pincodes, branch_pincodes]))
+        residential_codes = pincode_codes[:len(df)]
+        branch_codes = pincode_codes[len(df):]
+
+        # Look up each unique pincode once, with a trailing 'unknown' slot that code -1 picks up
+        unique_details = self.pincode_lookup.lookup_many(unique_pincodes).fillna('Unknown')
+        details = {key: np.append(unique_details[key].str.lower().to_numpy(dtype=object), 'unknown')
+                   for key in ['District', 'Region', 'State']}
+
+        # Resolve coordinates once per pincode, with a trailing NaN slot for code -1;
+        # only pincodes the offline index does not cover go through get_coordinates
+        coordinates = np.full((len(unique_pincodes) + 1, 2), np.nan)
+        coordinates[:-1] = self.geo_index.lookup_many(unique_pincodes)
+        missing = np.flatnonzero(np.isnan(coordinates[:-1, 0]))
+        geocoded = self.geocode_pincodes([unique_pincodes[i] for i in missing])
+        for i in missing:
+            if geocoded[unique_pincodes[i]]:
+                coordinates[i] = geocoded[unique_pincodes[i]]
+
+        # Distances once per residential/branch pair
+        pair_codes, unique_pairs = pd.factorize(pd.MultiIndex.from_arrays([residential_codes, branch_codes]))
+        pair_distances = batch_distance(coordinates[unique_pairs.get_level_values(0)],
+                                        coordinates[unique_pairs.get_level_values(1)],
+                                        method=self.distance_method)
+        # Same sentinel as process_data: unknown (and zero) distances become -1
+        pair_distances[np.isnan(pair_distances) | (pair_distances == 0)] = -1
+
+        processed = pd.DataFrame({
+            'R_District': details['District'][residential_codes],
+            'R_Region': details['Region'][residential_codes],
+            'R_State': details['State'][residential_codes],
+            'B_District': details['District'][branch_codes],
+            'B_Region': details['Region'][branch_codes],
+            'B_State': details['State'][branch_codes],
+            'Distance_Kilometers': pair_distances[pair_codes],
+            'CandidateID': df['CandidateID'].to_numpy()
+        })
+
+        if len(self.pincode_details_df):
+            processed = pd.concat([self.pincode_details_df, processed], ignore_index=True)
+        self.pincode_details_df = processed
+
+    def clear_processed_data(self):
+        """
+        Empty the processed DataFrame, e.g. before processing the next chunk of candidates.
+        """
+        self.pincode_details_df = self.pincode_details_df.iloc[0:0]
+
     def get_processed_data(self):
         """
         Get the processed DataFrame containing extracted details and calculated distances.
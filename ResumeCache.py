@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import sqlite3
+
+
+def file_sha256(path):
+    """
+    Compute the SHA-256 hash of a file's contents.
+
+    Args:
+    - path (str or Path): Path to the file.
+
+    Returns:
+    - str: Hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ResumeCache:
+    """
+    Persistent SQLite cache of parsed resumes.
+
+    Entries are keyed by file path and validated against the file's size and mtime; when those
+    changed, the content hash decides whether the resume really changed. Each entry holds the
+    cleaned text and the fingerprint of the parser that produced it, so a change to the reading
+    or cleaning code turns every entry into a miss. It also holds the language and skill results
+    and the fingerprint of the vocabulary (skills file and language list) they were computed
+    with, so a vocabulary change only invalidates the results and not the parsed text.
+
+    Args:
+    - cache_path (str, optional): Path of the SQLite database. Defaults to 'resume_cache.sqlite'.
+    - parser (str, optional): Fingerprint of the code that reads and cleans resumes. Defaults to ''.
+
+    Attributes:
+    - hits (int): Resumes whose cleaned text was served from the cache.
+    - misses (int): Resumes that were new or changed.
+    """
+
+    def __init__(self, cache_path='resume_cache.sqlite', parser=''):
+        self.cache_path = cache_path
+        self.parser = parser
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(cache_path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS resumes ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL, "
+            "text TEXT NOT NULL, vocabulary TEXT, languages TEXT, skills TEXT, parser TEXT)"
+        )
+        # Databases written before the parser column existed: their entries never match a parser
+        columns = [column[1] for column in self.connection.execute("PRAGMA table_info(resumes)")]
+        if 'parser' not in columns:
+            self.connection.execute("ALTER TABLE resumes ADD COLUMN parser TEXT")
+        self.connection.commit()
+
+    def get_text(self, path):
+        """
+        Get the cached cleaned text of a resume if the file is unchanged and was parsed by the current parser.
+
+        Args:
+        - path (str or Path): Path to the resume file.
+
+        Returns:
+        - str or None: Cleaned text, or None if the file is missing, new or changed, or the parser changed.
+        """
+        path = str(path)
+        row = self.connection.execute(
+            "SELECT size, mtime_ns, sha256, text FROM resumes WHERE path = ? AND parser = ?", (path, self.parser)
+        ).fetchone()
+        try:
+            stat = os.stat(path)
+        except OSError:
+            row = None
+
+        if row is not None:
+            size, mtime_ns, sha256, text = row
+            if (size, mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                self.hits += 1
+                return text
+            # Size or mtime changed: the contents decide whether the resume really changed
+            if size == stat.st_size and sha256 == file_sha256(path):
+                self.connection.execute(
+                    "UPDATE resumes SET mtime_ns = ? WHERE path = ?", (stat.st_mtime_ns, path)
+                )
+                self.connection.commit()
+                self.hits += 1
+                return text
+
+        self.misses += 1
+        return None
+
+    def put_text(self, path, text):
+        """
+        Store the cleaned text of a resume with the current parser, discarding any cached language and skill results.
+
+        Args:
+        - path (str or Path): Path to the resume file.
+        - text (str): Cleaned text.
+        """
+        path = str(path)
+        stat = os.stat(path)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO resumes (path, size, mtime_ns, sha256, text, parser) VALUES (?, ?, ?, ?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime_ns, file_sha256(path), text, self.parser)
+        )
+        self.connection.commit()
+
+    def get_results(self, path, vocabulary):
+        """
+        Get cached language and skill results computed with the given vocabulary.
+
+        Args:
+        - path (str or Path): Path to the resume file.
+        - vocabulary (str): Fingerprint of the skills file and language list.
+
+        Returns:
+        - tuple or None: (list of 0/1 language flags, list of skills), or None if not cached for this vocabulary.
+        """
+        row = self.connection.execute(
+            "SELECT languages, skills FROM resumes WHERE path = ? AND vocabulary = ?", (str(path), vocabulary)
+        ).fetchone()
+        if row is None:
+            return None
+        languages, skills = row
+        return [int(flag) for flag in languages], json.loads(skills)
+
+    def put_results(self, paths, vocabulary, languages, skills):
+        """
+        Store language and skill results for cached resumes.
+
+        Args:
+        - paths (list): Paths to the resume files.
+        - vocabulary (str): Fingerprint of the skills file and language list.
+        - languages (list): Per resume, list of 0/1 language flags.
+        - skills (list): Per resume, list of skills found.
+        """
+        self.connection.executemany(
+            "UPDATE resumes SET vocabulary = ?, languages = ?, skills = ? WHERE path = ?",
+            [(vocabulary, ''.join(str(int(flag)) for flag in flags), json.dumps(found), str(path))
+             for path, flags, found in zip(paths, languages, skills)]
+        )
+        self.connection.commit()
+
+    def close(self):
+        """
+        Close the underlying database connection.
+        """
+        self.connection.close()
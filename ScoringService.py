@@ -0,0 +1,301 @@
+import sys
+import getopt
+import io
+import json
+import pickle
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+from FinalProcessing import FeatureSchema, Preprocessor
+from TreeModel import TreeModel
+
+USAGE = ('Usage: python ScoringService.py [--host <host>] [--port <port>] [--model <pickle|npz>] [--max-batch <rows>] '
+         '[--max-wait-ms <ms>] [--sparse]')
+
+PARQUET_TYPE = 'application/vnd.apache.parquet'
+
+
+def predictions_frame(probabilities, candidate_ids):
+    """
+    Build the predictions table written to predictions.csv.
+
+    Args:
+    - probabilities (numpy.ndarray): (rows, 2) class probabilities from predict_proba.
+    - candidate_ids (array-like): Candidate IDs aligned with the rows.
+
+    Returns:
+    - pandas.DataFrame: 'Class_1', 'Class_2', 'CandidateID' (uppercase) and 'Performance' (1 if Class_2 is more likely).
+    """
+    predictions = pd.DataFrame(probabilities, columns=['Class_1', 'Class_2'])
+    predictions['CandidateID'] = np.asarray(candidate_ids)
+
+    predictions['Performance'] = np.where(predictions['Class_2'] > predictions['Class_1'], 1, 0)
+    predictions['CandidateID'] = predictions['CandidateID'].str.upper()
+    return predictions
+
+
+class ScoringService:
+    """
+    Scores enriched candidate rows with a model and feature schema that are loaded once.
+
+    Concurrent score calls are queued and a single worker thread merges them into micro-batches, so
+    one predict_proba call serves many requests. A batch is closed when it reaches `max_batch_rows`
+    rows or when its first request has waited `max_wait` seconds.
+
+    Args:
+    - model_file (str, optional): Pickled XGBClassifier, or an .npz file of trees exported by TreeModel.export_trees,
+      which scores without importing xgboost. Defaults to 'xgboost_model.pkl'.
+    - preprocessor (Preprocessor, optional): Preprocessor holding the feature schema. Defaults to a new one with the
+      schema in the model's column order (FeatureSchema.for_model).
+    - sparse (bool, optional): Score on the sparse feature matrix (for models trained with --sparse). Defaults to False.
+    - max_batch_rows (int, optional): Maximum rows per predict_proba call. Defaults to 4096.
+    - max_wait (float, optional): Maximum seconds a request waits for others to join its batch. Defaults to 0.005.
+    - latency_window (int, optional): Number of most recent request latencies kept for the report. Defaults to 10000.
+
+    Attributes:
+    - latencies (collections.deque): Recent request latencies in seconds, from submission to result.
+    - batch_sizes (collections.deque): Requests merged into each recent batch.
+    """
+
+    def __init__(self, model_file='xgboost_model.pkl', preprocessor=None, sparse=False, max_batch_rows=4096,
+                 max_wait=0.005, latency_window=10000):
+        if model_file.endswith('.npz'):
+            self.model = TreeModel.load(model_file)
+        else:
+            with open(model_file, 'rb') as f:
+                self.model = pickle.load(f)
+        self.preprocessor = preprocessor or Preprocessor(schema=FeatureSchema.for_model(self.model, sparse=sparse))
+        self.sparse = sparse
+        if sparse:
+            self.preprocessor.get_skill_vocabulary()
+        self.schema = self.preprocessor.get_schema()
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait
+        self.latencies = deque(maxlen=latency_window)
+        self.batch_sizes = deque(maxlen=latency_window)
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def score(self, df):
+        """
+        Score a DataFrame of enriched candidates, blocking until its batch has been predicted.
+
+        Args:
+        - df (pandas.DataFrame): Rows in the format of the last pipeline stage (cvmerged), with 'CandidateID'.
+
+        Returns:
+        - pandas.DataFrame: Predictions in the format of predictions.csv, one row per input row.
+        """
+        start = time.perf_counter()
+        future = Future()
+        self.requests.put((df.reset_index(drop=True), future))
+        predictions = future.result()
+        with self.lock:
+            self.latencies.append(time.perf_counter() - start)
+        return predictions
+
+    def _features(self, df):
+        """
+        Preprocess a DataFrame into the model's feature matrix.
+
+        Args:
+        - df (pandas.DataFrame): Enriched candidates.
+
+        Returns:
+        - numpy.ndarray or scipy.sparse.csr_matrix: Feature matrix.
+        """
+        if self.sparse:
+            return self.preprocessor.sparse_matrix(df.copy())
+        return self.schema.to_matrix(self.preprocessor.preprocess(df.copy()))
+
+    def _predict(self, df):
+        """
+        Predict one DataFrame.
+
+        Args:
+        - df (pandas.DataFrame): Enriched candidates.
+
+        Returns:
+        - pandas.DataFrame: Predictions in the format of predictions.csv.
+        """
+        return predictions_frame(self.model.predict_proba(self._features(df)), df['CandidateID'].to_numpy())
+
+    def _next_batch(self):
+        """
+        Wait for a request, then collect more until the batch is full or the first request's wait is over.
+
+        Returns:
+        - list: (DataFrame, Future) pairs.
+        """
+        batch = [self.requests.get()]
+        rows = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            rows += len(request[0])
+        return batch
+
+    def _run(self):
+        """
+        Worker loop: predict each micro-batch with one predict_proba call and hand every request its rows.
+        """
+        while True:
+            batch = self._next_batch()
+            with self.lock:
+                self.batch_sizes.append(len(batch))
+            try:
+                predictions = self._predict(pd.concat([df for df, _ in batch], ignore_index=True))
+            except Exception:
+                # Score the requests one by one, so only the request that cannot be scored fails
+                for df, future in batch:
+                    try:
+                        future.set_result(self._predict(df))
+                    except Exception as e:
+                        future.set_exception(e)
+                continue
+
+            start = 0
+            for df, future in batch:
+                future.set_result(predictions.iloc[start:start + len(df)].reset_index(drop=True))
+                start += len(df)
+
+    def latency_report(self):
+        """
+        Summarize recent request latencies.
+
+        Returns:
+        - dict: Number of requests, p50 and p99 latency (milliseconds) and mean requests per batch.
+        """
+        with self.lock:
+            latencies = np.array(self.latencies)
+            batch_sizes = np.array(self.batch_sizes)
+        if not len(latencies):
+            return {'requests': 0, 'p50_ms': None, 'p99_ms': None, 'mean_requests_per_batch': None}
+        return {
+            'requests': len(latencies),
+            'p50_ms': 1000 * float(np.percentile(latencies, 50)),
+            'p99_ms': 1000 * float(np.percentile(latencies, 99)),
+            'mean_requests_per_batch': float(batch_sizes.mean()),
+        }
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    """
+    HTTP interface of a ScoringService.
+
+    - POST /predict with a body of enriched candidates returns the predictions as CSV. The body is
+      a cvmerged checkpoint file as written by main.py when sent with Content-Type
+      application/vnd.apache.parquet, and CSV otherwise.
+    - GET /stats returns the latency report as JSON.
+    """
+
+    service = None
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self.send_error(404)
+            return
+        body = io.BytesIO(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        try:
+            if self.headers.get('Content-Type', '').startswith(PARQUET_TYPE):
+                df = pd.read_parquet(body)
+            else:
+                df = pd.read_csv(body)
+            predictions = self.service.score(df)
+        except Exception as e:
+            self.send_error(400, explain=str(e))
+            return
+        self._reply(predictions.to_csv(index=False).encode(), 'text/csv')
+
+    def do_GET(self):
+        if self.path != '/stats':
+            self.send_error(404)
+            return
+        self._reply(json.dumps(self.service.latency_report()).encode(), 'application/json')
+
+    def _reply(self, payload, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # Per-request logging would dominate the latency of small requests
+        pass
+
+
+def serve(service, host='127.0.0.1', port=8000):
+    """
+    Serve a ScoringService over HTTP until interrupted, then print its latency report.
+
+    Args:
+    - service (ScoringService): Service to expose.
+    - host (str, optional): Address to bind. Defaults to '127.0.0.1'.
+    - port (int, optional): Port to bind. Defaults to 8000.
+    """
+    handler = type('BoundScoringHandler', (ScoringHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Scoring on http://{host}:{port}/predict, latency report on /stats")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for key, value in service.latency_report().items():
+            print(f"{key}: {value}")
+
+
+def main(argv):
+    """
+    Start the scoring service.
+
+    Args:
+    - argv (list): Command-line arguments.
+    """
+    options = {'host': '127.0.0.1', 'port': 8000, 'model': 'xgboost_model.pkl', 'max_batch': 4096, 'max_wait_ms': 5.0,
+               'sparse': False}
+    try:
+        opts, _ = getopt.getopt(argv, "h", ["host=", "port=", "model=", "max-batch=", "max-wait-ms=", "sparse"])
+    except getopt.GetoptError:
+        print(USAGE)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            print(USAGE)
+            sys.exit()
+        elif opt == "--host":
+            options['host'] = arg
+        elif opt == "--port":
+            options['port'] = int(arg)
+        elif opt == "--model":
+            options['model'] = arg
+        elif opt == "--max-batch":
+            options['max_batch'] = int(arg)
+        elif opt == "--max-wait-ms":
+            options['max_wait_ms'] = float(arg)
+        elif opt == "--sparse":
+            options['sparse'] = True
+
+    service = ScoringService(options['model'], sparse=options['sparse'], max_batch_rows=options['max_batch'],
+                             max_wait=options['max_wait_ms'] / 1000)
+    serve(service, options['host'], options['port'])
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,84 @@
+from collections import deque
+
+
+class SkillMatcher:
+    """
+    Aho-Corasick automaton that finds every skill of a vocabulary in a text in a single pass.
+
+    Args:
+    - skills (iterable): Skill names; each is matched as str(skill).lower().
+    - word_boundary (bool, optional): Only count matches that are not part of a longer word,
+      so 'energy' no longer matches inside 'synergy'. Defaults to False (plain substring match).
+
+    Attributes:
+    - skills (list): Skill names in vocabulary order.
+    - transitions (list): Per-state dict of character to next state (a complete DFA over the pattern alphabet).
+    - outputs (list): Per-state list of (skill index, pattern length) pairs ending at that state.
+    """
+
+    def __init__(self, skills, word_boundary=False):
+        self.skills = list(skills)
+        self.word_boundary = word_boundary
+
+        # Trie of all patterns
+        self.transitions = [{}]
+        self.outputs = [[]]
+        for index, skill in enumerate(self.skills):
+            pattern = str(skill).lower()
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                if char not in self.transitions[state]:
+                    self.transitions.append({})
+                    self.outputs.append([])
+                    self.transitions[state][char] = len(self.transitions) - 1
+                state = self.transitions[state][char]
+            self.outputs[state].append((index, len(pattern)))
+
+        # Breadth-first pass: fill failure links into the transition tables and merge outputs,
+        # so matching needs one dict lookup per character and never follows failure links
+        failure = [0] * len(self.transitions)
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            fallback = self.transitions[failure[state]]
+            self.outputs[state] = self.outputs[state] + self.outputs[failure[state]]
+            for char, next_state in list(self.transitions[state].items()):
+                failure[next_state] = fallback.get(char, 0)
+                queue.append(next_state)
+            for char, next_state in fallback.items():
+                self.transitions[state].setdefault(char, next_state)
+
+    def find(self, text):
+        """
+        Find the skills mentioned in a text.
+
+        Args:
+        - text (str): Text to search.
+
+        Returns:
+        - list: Skills found, in vocabulary order, each listed once.
+        """
+        text = str(text).lower()
+        transitions = self.transitions
+        outputs = self.outputs
+        found = set()
+        state = 0
+        for position, char in enumerate(text):
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                for index, length in outputs[state]:
+                    if index in found:
+                        continue
+                    if self.word_boundary and not self._on_boundary(text, position - length + 1, position + 1):
+                        continue
+                    found.add(index)
+        return [self.skills[index] for index in sorted(found)]
+
+    @staticmethod
+    def _on_boundary(text, start, end):
+        """
+        Check that text[start:end] is not preceded or followed by a letter or digit.
+        """
+        return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
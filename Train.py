@@ -1,9 +1,46 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import scipy.sparse
 from sklearn.model_selection import StratifiedKFold
-from xgboost import XGBClassifier
+from xgboost import XGBClassifier, DMatrix
+import xgboost
 from sklearn.metrics import f1_score
 import optuna
 from optuna import create_study
 
+def study_storage(path):
+    """
+    Open local SQLite storage for Optuna studies.
+
+    Args:
+    - path (str): SQLite file.
+
+    Returns:
+    - optuna.storages.RDBStorage: Storage that waits for the database lock instead of failing when workers write at once.
+    """
+    return optuna.storages.RDBStorage(f'sqlite:///{path}', engine_kwargs={'connect_args': {'timeout': 60}})
+
+def run_study_worker(trainer_args, storage_path, study_name, n_trials):
+    """
+    Run trials of a stored study in a worker process, on a ModelTrainer of its own.
+
+    Args:
+    - trainer_args (dict): ModelTrainer arguments, including the worker's n_jobs thread budget.
+    - storage_path (str): SQLite file of the study.
+    - study_name (str): Name of the study.
+    - n_trials (int): Number of trials to run.
+
+    Returns:
+    - list: Wall-clock time of each trial the worker ran.
+    """
+    trainer = ModelTrainer(**trainer_args)
+    study = optuna.load_study(study_name=study_name, storage=study_storage(storage_path), pruner=trainer._create_pruner())
+    study.optimize(trainer.objective, n_trials=n_trials)
+    return trainer.trial_seconds
+
 class ModelTrainer:
     """
     Class to train an XGBoost classifier with hyperparameter optimization using Optuna.
@@ -14,14 +51,41 @@ class ModelTrainer:
     - feature_cols (list or str, optional): List of feature columns or 'auto' to automatically select features. Defaults to 'auto'.
     - cv (int, optional): Number of folds for cross-validation. Defaults to 5.
     - random_state (int, optional): Random state for reproducibility. Defaults to 42.
+    - matrix (scipy.sparse.csr_matrix, optional): Feature matrix with one row per train_data row and one column per feature column,
+      e.g. from Preprocessor.sparse_matrix. When given, folds and the final model train on it instead of train_data[feature_cols].
+      Defaults to None.
+    - tree_method (str, optional): XGBoost tree method, 'gpu_hist' or 'hist' for CPU-only machines. Defaults to 'gpu_hist'.
+    - n_jobs (int, optional): CPU threads XGBoost uses. Defaults to None (all cores).
+    - early_stopping_rounds (int, optional): Stop a fold's training when the validation log loss has not improved for this
+      many rounds. Defaults to 50; None trains all n_estimators trees.
+    - pruner (str, optional): Optuna pruner that stops hopeless trials after a fold: 'median', 'halving'
+      (successive halving) or None. Defaults to 'median'.
+
+    Attributes:
+    - X (numpy.ndarray or scipy.sparse.csr_matrix): float32 features (a C-contiguous array, or CSR for matrix input),
+      rows grouped by fold.
+    - y (numpy.ndarray): float32 labels aligned with X.
+    - row_order (numpy.ndarray): train_data row of each row of X.
+    - fold_bounds (numpy.ndarray): First row of each fold in X, followed by the number of rows. The validation rows of a
+      fold are the contiguous block fold_bounds[fold] to fold_bounds[fold + 1].
+    - folds (list): Per fold (training DMatrix, validation DMatrix, training labels, validation labels), built once and
+      reused by every trial.
+    - trial_seconds (list): Wall-clock time of each finished or pruned trial.
     """
 
-    def __init__(self, train_data, target_col, feature_cols='auto', cv=5, random_state=42):
+    def __init__(self, train_data, target_col, feature_cols='auto', cv=5, random_state=42, matrix=None,
+                 tree_method='gpu_hist', n_jobs=None, early_stopping_rounds=50, pruner='median'):
         self.train_data = train_data
+        self.matrix = matrix
         self.target_col = target_col
         self.cv = cv
         self.random_state = random_state
+        self.tree_method = tree_method
+        self.n_jobs = n_jobs
+        self.early_stopping_rounds = early_stopping_rounds
+        self.pruner = pruner
         self.best_params = None
+        self.trial_seconds = []
 
         # If feature_cols is set to 'auto', select all columns except 'CandidateID' and target_col
         if feature_cols == 'auto':
@@ -31,11 +95,25 @@ class ModelTrainer:
 
         # Initialize StratifiedKFold for cross-validation
         self.kfold = StratifiedKFold(n_splits=self.cv, random_state=self.random_state, shuffle=True)
-        
-        # Assign fold numbers to each row in train_data
-        for i, (trn, val) in enumerate(self.kfold.split(self.train_data, self.train_data[target_col])):
-            self.train_data.loc[val, 'kfold'] = i
-        self.train_data['kfold'] = self.train_data['kfold'].astype(int)
+        y = self.train_data[target_col].to_numpy(dtype=np.float32)
+
+        # Order the rows by fold in one gather, so each fold's validation rows are a contiguous block of X;
+        # train_data itself is left untouched
+        validation_rows = [val for _, val in self.kfold.split(np.zeros(len(y)), y)]
+        self.row_order = np.concatenate(validation_rows)
+        self.fold_bounds = np.cumsum([0] + [len(val) for val in validation_rows])
+        if matrix is not None:
+            self.X = matrix.tocsr()[self.row_order].astype(np.float32)
+        else:
+            self.X = self.train_data[self.feature_cols].to_numpy(dtype=np.float32)[self.row_order]
+        self.y = y[self.row_order]
+
+        # Convert every fold to DMatrix once instead of once per fold of every trial
+        self.folds = []
+        for fold in range(self.cv):
+            xtr, ytr, xval, yval = self._get_train_val_split(fold)
+            self.folds.append((DMatrix(xtr, label=ytr, nthread=self.n_jobs or -1),
+                               DMatrix(xval, label=yval, nthread=self.n_jobs or -1), ytr, yval))
 
     def objective(self, trial):
         """
@@ -46,15 +124,31 @@ class ModelTrainer:
 
         Returns:
         - float: Negative average f1 score over all folds.
+
+        Raises:
+        - optuna.TrialPruned: If the pruner stops the trial after a fold.
         """
+        start = time.perf_counter()
         f1 = 0
-        for fold in range(5):
-            xtr, ytr, xval, yval = self._get_train_val_split(fold)
+        best_iterations = []
+        try:
+            for fold in range(self.cv):
+                dtrain, dval, ytr, yval = self.folds[fold]
 
-            # Train XGBoost model and calculate f1 score
-            _, metrics = self.fit_xgb(trial, xtr, ytr, xval, yval)
-            f1 += metrics['valid f1_score'] / 5  # Average f1 score over all folds
-        
+                # Train XGBoost model and calculate f1 score
+                _, metrics = self.fit_xgb(trial, dtrain, ytr, dval, yval)
+                f1 += metrics['valid f1_score'] / self.cv  # Average f1 score over all folds
+                best_iterations.append(metrics['best iteration'])
+
+                # Report the mean over the folds so far, so the pruner can stop a hopeless trial early
+                trial.report(-f1 * self.cv / (fold + 1), fold)
+                if trial.should_prune():
+                    raise optuna.TrialPruned()
+        finally:
+            self.trial_seconds.append(time.perf_counter() - start)
+
+        # Trees the final model needs, from where early stopping ended in each fold
+        trial.set_user_attr('best_iterations', best_iterations)
         return -f1  # Negative because Optuna minimizes the objective function
 
     def _get_train_val_split(self, fold):
@@ -65,13 +159,15 @@ class ModelTrainer:
         - fold (int): Fold number.
 
         Returns:
-        - tuple: Tuple containing xtr, ytr, xval, yval.
+        - tuple: Tuple containing xtr, ytr, xval, yval. The validation arrays are views into X and y; the training
+          rows are the blocks before and after them, joined.
         """
-        trn_idx = self.train_data['kfold'] != fold
-        val_idx = self.train_data['kfold'] == fold
-        trn = self.train_data.loc[trn_idx, :]
-        val = self.train_data.loc[val_idx, :]
-        return trn[self.feature_cols].values, trn[self.target_col].values, val[self.feature_cols].values, val[self.target_col].values
+        start, stop = self.fold_bounds[fold], self.fold_bounds[fold + 1]
+        if scipy.sparse.issparse(self.X):
+            xtr = scipy.sparse.vstack([self.X[:start], self.X[stop:]], format='csr')
+        else:
+            xtr = np.concatenate([self.X[:start], self.X[stop:]])
+        return xtr, np.concatenate([self.y[:start], self.y[stop:]]), self.X[start:stop], self.y[start:stop]
 
     def fit_xgb(self, trial, xtr, ytr, xval, yval):
         """
@@ -79,11 +175,11 @@ class ModelTrainer:
 
         Args:
         - trial (optuna.Trial): Optuna trial object.
-        - xtr, ytr (array-like): Training data and labels.
-        - xval, yval (array-like): Validation data and labels.
+        - xtr, ytr (xgboost.DMatrix, array-like): Training data and labels.
+        - xval, yval (xgboost.DMatrix, array-like): Validation data and labels.
 
         Returns:
-        - tuple: Tuple containing trained model and dictionary of metrics.
+        - tuple: Tuple containing trained booster and dictionary of metrics, including the 0-based 'best iteration'.
         """
         params = {
             "n_estimators": trial.suggest_int("n_estimators", 200, 2000, 100),
@@ -96,39 +192,127 @@ class ModelTrainer:
             "min_child_weight": trial.suggest_int("min_child_weight", 5, 20),
         }
 
-        model = XGBClassifier(**params, tree_method='gpu_hist', random_state=self.random_state)
-        model.fit(xtr, ytr, eval_metric='mlogloss')
-        
-        # Predict on training and validation data
-        y_tr_pred = model.predict(xtr)
-        y_val_pred = model.predict(xval)
+        # Native training on the prebuilt DMatrix; the parameter names are the same as XGBClassifier's
+        booster_params = {key: value for key, value in params.items() if key != 'n_estimators'}
+        booster_params.update(self._xgb_params(), objective='binary:logistic', eval_metric='logloss')
+        if self.early_stopping_rounds is None:
+            model = xgboost.train(booster_params, xtr, num_boost_round=params['n_estimators'])
+            best_iteration = params['n_estimators'] - 1
+        else:
+            model = xgboost.train(booster_params, xtr, num_boost_round=params['n_estimators'], evals=[(xval, 'valid')],
+                                  early_stopping_rounds=self.early_stopping_rounds, verbose_eval=False)
+            best_iteration = model.best_iteration
+
+        # Predict on training and validation data with the trees up to the best iteration
+        iteration_range = (0, best_iteration + 1)
+        y_tr_pred = (model.predict(xtr, iteration_range=iteration_range) > 0.5).astype(int)
+        y_val_pred = (model.predict(xval, iteration_range=iteration_range) > 0.5).astype(int)
         
         # Calculate f1 score
         f1 = {
             "train f1_score": f1_score(ytr, y_tr_pred, average='micro'),
-            "valid f1_score": f1_score(yval, y_val_pred, average='micro')
+            "valid f1_score": f1_score(yval, y_val_pred, average='micro'),
+            "best iteration": best_iteration
         }
         
         return model, f1
 
-    def optimize_hyperparams(self, n_trials=20):
+    def _xgb_params(self):
+        """
+        Get the fixed native XGBoost parameters of the trials, besides the searched ones.
+
+        Returns:
+        - dict: Tree method, seed and thread count.
+        """
+        params = {'tree_method': self.tree_method, 'seed': self.random_state}
+        if self.n_jobs is not None:
+            params['nthread'] = self.n_jobs
+        return params
+
+    def _create_pruner(self):
+        """
+        Create the Optuna pruner.
+
+        Returns:
+        - optuna.pruners.BasePruner: Pruner; NopPruner if pruning is off.
+        """
+        if self.pruner == 'median':
+            # Compare from the first fold on, once a few trials have finished
+            return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=0)
+        if self.pruner == 'halving':
+            return optuna.pruners.SuccessiveHalvingPruner()
+        if self.pruner is None:
+            return optuna.pruners.NopPruner()
+        raise ValueError(f"Unknown pruner {self.pruner}")
+
+    def optimize_hyperparams(self, n_trials=20, storage=None, study_name='XGBoost optimization', n_workers=1):
         """
         Optimize hyperparameters using Optuna.
+        With early stopping, n_estimators of the best parameters is the mean number of trees the best trial's folds stopped at,
+        or the trial's own n_estimators if it was saved without them.
+
+        With a storage file the study is saved to SQLite under its name and resumed when it already exists: n_trials is the
+        total number of finished (complete or pruned) trials, so a killed search continues where it stopped. Trials that
+        were running when the process was killed are not counted. Several workers need a storage file; each runs its
+        share of the trials in its own process, with the CPU threads split between them. Every worker is a spawned process
+        that imports the launching script's modules again and builds its own ModelTrainer, with its own copy of the
+        training data, X and the cv fold DMatrix pairs, so peak memory grows by about n_workers x (imports + data + cv folds)
+        on top of this process.
 
         Args:
         - n_trials (int, optional): Number of trials for optimization. Defaults to 20.
+        - storage (str, optional): SQLite file to keep the study in. Defaults to None (in memory).
+        - study_name (str, optional): Name of the study in the storage. Defaults to 'XGBoost optimization'.
+        - n_workers (int, optional): Number of worker processes. Defaults to 1 (trials run in this process).
+
+        Returns:
+        - optuna.Study: The finished study.
         """
-        study = create_study(direction="minimize", study_name='XGBoost optimization')
-        study.optimize(self.objective, n_trials=n_trials)
-        self.best_params = study.best_params
+        if n_workers > 1 and storage is None:
+            raise ValueError("Parallel studies need a storage file to share trials between workers")
+
+        study = create_study(direction="minimize", study_name=study_name, pruner=self._create_pruner(),
+                             storage=study_storage(storage) if storage else None, load_if_exists=True)
+        finished = [optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED]
+        remaining = max(n_trials - len(study.get_trials(deepcopy=False, states=finished)), 0)
+
+        if n_workers == 1:
+            study.optimize(self.objective, n_trials=remaining)
+        elif remaining:
+            # Split the trials and the CPU threads between the workers, so XGBoost does not oversubscribe the cores
+            threads = max((self.n_jobs or os.cpu_count()) // n_workers, 1)
+            trainer_args = {'train_data': self.train_data, 'target_col': self.target_col, 'feature_cols': self.feature_cols,
+                            'cv': self.cv, 'random_state': self.random_state, 'matrix': self.matrix,
+                            'tree_method': self.tree_method, 'n_jobs': threads,
+                            'early_stopping_rounds': self.early_stopping_rounds, 'pruner': self.pruner}
+            shares = [len(share) for share in np.array_split(np.arange(remaining), n_workers) if len(share)]
+            # Spawned workers start without the parent's OpenMP thread pool
+            with ProcessPoolExecutor(max_workers=len(shares), mp_context=multiprocessing.get_context('spawn')) as executor:
+                futures = [executor.submit(run_study_worker, trainer_args, storage, study_name, share) for share in shares]
+                for future in futures:
+                    self.trial_seconds.extend(future.result())
+
+        self.best_params = dict(study.best_params)
+        # Trials of studies saved before early stopping have no best_iterations; they keep their n_estimators
+        best_iterations = study.best_trial.user_attrs.get('best_iterations')
+        if self.early_stopping_rounds is not None and best_iterations:
+            self.best_params['n_estimators'] = int(np.mean(best_iterations)) + 1
+
+        pruned = sum(trial.state == optuna.trial.TrialState.PRUNED for trial in study.trials)
+        if self.trial_seconds:
+            print(f"Trial time: mean {np.mean(self.trial_seconds):.1f} s, total {np.sum(self.trial_seconds):.1f} s "
+                  f"over {len(self.trial_seconds)} trials ({self.tree_method}), {pruned} pruned in the study")
+        return study
 
     def train_final_model(self):
         """
-        Train the final model using the best hyperparameters.
+        Train the final model using the best hyperparameters, on the rows in train_data order with the original labels.
 
         Returns:
         - XGBClassifier: Trained XGBoost model.
         """
-        model = XGBClassifier(**self.best_params, tree_method='gpu_hist', random_state=self.random_state)
-        model.fit(self.train_data[self.feature_cols], self.train_data[self.target_col])
+        model = XGBClassifier(**self.best_params, tree_method=self.tree_method, n_jobs=self.n_jobs,
+                              random_state=self.random_state)
+        # Undo the fold grouping, so row sampling and classes_ are the same as when fitting on train_data
+        model.fit(self.X[np.argsort(self.row_order)], self.train_data[self.target_col].to_numpy())
         return model
@@ -0,0 +1,213 @@
+import json
+import os
+import tempfile
+import numpy as np
+
+
+def export_trees(model, path='xgboost_trees.npz'):
+    """
+    Export the trees of a trained binary XGBClassifier into array-backed form.
+
+    The booster is read from XGBoost's own JSON model format, so thresholds and leaf values are exact.
+    Nodes of all trees are concatenated; `roots` holds the first node of each tree.
+
+    Args:
+    - model (xgboost.XGBClassifier or xgboost.Booster): Trained model with a binary:logistic objective.
+    - path (str, optional): Output .npz file. Defaults to 'xgboost_trees.npz'.
+
+    Returns:
+    - TreeModel: The exported trees.
+    """
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    with tempfile.TemporaryDirectory() as folder:
+        model_file = os.path.join(folder, 'model.json')
+        booster.save_model(model_file)
+        with open(model_file) as f:
+            learner = json.load(f)['learner']
+
+    objective = learner['objective']['name']
+    if objective != 'binary:logistic':
+        raise ValueError(f"Only binary:logistic models can be exported, got {objective}")
+    gradient_booster = learner['gradient_booster']
+    if gradient_booster['name'] != 'gbtree':
+        raise ValueError(f"Only gbtree boosters can be exported, got {gradient_booster['name']}")
+
+    trees = gradient_booster['model']['trees']
+    # Trees after the best early-stopping iteration are not used by predict_proba
+    best_iteration = getattr(model, 'best_iteration', None)
+    if best_iteration is not None:
+        # The number of trees per round is a training parameter, kept in the booster config rather than the model
+        train_param = json.loads(booster.save_config())['learner']['gradient_booster'].get('gbtree_train_param', {})
+        trees = trees[:(best_iteration + 1) * int(train_param.get('num_parallel_tree', 1))]
+
+    roots, feature, threshold, left, right, default_left = [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        children_left = np.array(tree['left_children'], dtype=np.int32)
+        is_leaf = children_left == -1
+        roots.append(offset)
+        feature.append(np.where(is_leaf, -1, np.array(tree['split_indices'], dtype=np.int32)))
+        # Leaves keep their value in split_conditions
+        threshold.append(np.array(tree['split_conditions'], dtype=np.float32))
+        left.append(np.where(is_leaf, -1, children_left + offset))
+        right.append(np.where(is_leaf, -1, np.array(tree['right_children'], dtype=np.int32) + offset))
+        default_left.append(np.array(tree['default_left'], dtype=bool))
+        offset += len(children_left)
+
+    # predict_proba adds the base score as a margin: logit(base_score)
+    base_score = float(learner['learner_model_param']['base_score'])
+    tree_model = TreeModel(
+        roots=np.array(roots, dtype=np.int32),
+        feature=np.concatenate(feature).astype(np.int32),
+        threshold=np.concatenate(threshold),
+        left=np.concatenate(left).astype(np.int32),
+        right=np.concatenate(right).astype(np.int32),
+        default_left=np.concatenate(default_left),
+        base_margin=np.log(base_score / (1 - base_score)),
+        n_features=int(learner['learner_model_param']['num_feature']),
+    )
+    tree_model.save(path)
+    return tree_model
+
+
+class TreeModel:
+    """
+    Array-backed gradient-boosted trees with a NumPy batch evaluator that does not need xgboost.
+
+    A node goes to its left child when the feature value is below the threshold, and to the child given by
+    default_left when the value is missing (NaN). Leaves have feature -1 and keep their value in threshold.
+
+    Args:
+    - roots (numpy.ndarray): First node of each tree.
+    - feature (numpy.ndarray): Split feature per node, -1 for leaves.
+    - threshold (numpy.ndarray): float32 split threshold per node, or leaf value for leaves.
+    - left (numpy.ndarray): Left child per node, -1 for leaves.
+    - right (numpy.ndarray): Right child per node, -1 for leaves.
+    - default_left (numpy.ndarray): Whether missing values go to the left child, per node.
+    - base_margin (float): Margin added to the sum of the leaves.
+    - n_features (int): Number of features the trees were trained on.
+    """
+
+    ARRAYS = ['roots', 'feature', 'threshold', 'left', 'right', 'default_left']
+
+    def __init__(self, roots, feature, threshold, left, right, default_left, base_margin, n_features):
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.base_margin = float(base_margin)
+        self.n_features = int(n_features)
+
+    def save(self, path):
+        """
+        Save the trees to an .npz file.
+
+        Args:
+        - path (str): Output file.
+        """
+        np.savez(path, base_margin=self.base_margin, n_features=self.n_features,
+                 **{name: getattr(self, name) for name in self.ARRAYS})
+
+    @classmethod
+    def load(cls, path='xgboost_trees.npz'):
+        """
+        Load trees saved by export_trees.
+
+        Args:
+        - path (str, optional): .npz file. Defaults to 'xgboost_trees.npz'.
+
+        Returns:
+        - TreeModel: The trees.
+        """
+        with np.load(path) as arrays:
+            return cls(**{name: arrays[name] for name in cls.ARRAYS},
+                       base_margin=float(arrays['base_margin']), n_features=int(arrays['n_features']))
+
+    def _dense_block(self, X, start, stop):
+        """
+        Get rows of the input as a float32 array, with unstored cells of sparse input as NaN (missing), as XGBoost reads them.
+
+        Args:
+        - X (numpy.ndarray or scipy.sparse.csr_matrix): Feature matrix.
+        - start (int): First row.
+        - stop (int): Row after the last.
+
+        Returns:
+        - numpy.ndarray: float32 array of shape (stop - start, n_features).
+        """
+        block = X[start:stop]
+        if not hasattr(block, 'tocoo'):
+            return np.asarray(block, dtype=np.float32)
+        block = block.tocoo()
+        dense = np.full(block.shape, np.nan, dtype=np.float32)
+        dense[block.row, block.col] = block.data
+        return dense
+
+    def predict_margin(self, X, block_rows=1024):
+        """
+        Sum the leaf values of all trees for each row, plus the base margin.
+
+        All trees advance one level per step for a block of rows at once, so the Python loop runs once per
+        tree level instead of once per row or tree.
+
+        Args:
+        - X (numpy.ndarray or scipy.sparse.csr_matrix): Feature matrix of shape (rows, n_features).
+        - block_rows (int, optional): Rows evaluated at once; bounds the (rows, trees) node array. Defaults to 1024.
+
+        Returns:
+        - numpy.ndarray: float32 margins, one per row.
+        """
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+
+        margins = np.empty(X.shape[0], dtype=np.float32)
+        for start in range(0, X.shape[0], block_rows):
+            block = self._dense_block(X, start, start + block_rows)
+            rows = np.arange(len(block))[:, None]
+            node = np.broadcast_to(self.roots, (len(block), len(self.roots))).copy()
+            while True:
+                feature = self.feature[node]
+                internal = feature >= 0
+                if not internal.any():
+                    break
+                value = block[rows, np.maximum(feature, 0)]
+                go_left = np.where(np.isnan(value), self.default_left[node], value < self.threshold[node])
+                node = np.where(internal, np.where(go_left, self.left[node], self.right[node]), node)
+            margins[start:start + len(block)] = self.threshold[node].sum(axis=1, dtype=np.float32) + self.base_margin
+        return margins
+
+    def predict_proba(self, X, block_rows=1024):
+        """
+        Predict class probabilities, like XGBClassifier.predict_proba.
+
+        Args:
+        - X (numpy.ndarray or scipy.sparse.csr_matrix): Feature matrix of shape (rows, n_features).
+        - block_rows (int, optional): Rows evaluated at once. Defaults to 1024.
+
+        Returns:
+        - numpy.ndarray: (rows, 2) probabilities of class 0 and class 1.
+        """
+        positive = 1 / (1 + np.exp(-self.predict_margin(X, block_rows)))
+        return np.column_stack([1 - positive, positive])
+
+
+def check_parity(model, tree_model, X):
+    """
+    Compare the exported trees with the model they were exported from.
+
+    Args:
+    - model (xgboost.XGBClassifier): Original model.
+    - tree_model (TreeModel): Exported trees.
+    - X (numpy.ndarray or scipy.sparse.csr_matrix): Feature matrix.
+
+    Returns:
+    - dict: Maximum absolute probability difference and share of rows with the same predicted class.
+    """
+    expected = model.predict_proba(X)
+    actual = tree_model.predict_proba(X)
+    return {
+        'max_abs_difference': float(np.abs(expected - actual).max()),
+        'same_class': float((expected.argmax(axis=1) == actual.argmax(axis=1)).mean()),
+    }
@@ -4,61 +4,136 @@ import getopt
 import chardet
 from InitialProcessor import InitialProcessor
 from PincodeProcess import PincodeDetailsExtractor
+from GeocodeCache import GeocodeCache
+from GeocodeClient import GeocodingClient
 from Demographics import DistrictDataProcessor
 from Companies import CompanyScraper
 from CVManual import ResumeProcessor
-from FinalProcessing import Preprocessor
+from FinalProcessing import FeatureSchema, Preprocessor, SkillVocabulary
 from Train import ModelTrainer
+from ScoringService import predictions_frame
+from TreeModel import export_trees, check_parity
+from Compaction import compact_dataframe, bytes_per_row
+from Checkpoints import StageCheckpoints, frame_fingerprint, source_fingerprint, folder_fingerprint
+from ResumeCache import file_sha256
+import PincodeIndex
+import DistrictIndex
+import SkillMatcher
+import Compaction
+import inspect
 import pickle
 import os
-import numpy as np
+import scipy.sparse
 import xgboost
 
-def load_data(argv):
+USAGE = 'Usage: python main.py -f <filename> [--limit <rows>] [--chunksize <rows>] [--sparse] [--tree-method <gpu_hist|hist>] [--threads <n>] [--study-storage <sqlite file>] [--study-name <name>] [--workers <n>] <resume folder> <true|false>'
+
+# Bytes read from the start of the input to detect its encoding
+ENCODING_SAMPLE_BYTES = 1 << 20
+
+def parse_args(argv):
     """
-    Load data from a CSV file.
+    Parse command-line arguments.
 
     Args:
     - argv (list): Command-line arguments.
 
     Returns:
-    - pandas.DataFrame: Loaded DataFrame.
+    - dict: 'inputfile', 'folder_path', 'train', 'limit' (None for all rows), 'chunksize', 'sparse',
+      'tree_method', 'threads' (None for all cores), 'study_storage' (None for in memory), 'study_name' and 'workers'.
     """
-    inputfile = ''
+    options = {'inputfile': '', 'limit': None, 'chunksize': 10000, 'sparse': False, 'tree_method': 'gpu_hist',
+               'threads': None, 'study_storage': None, 'study_name': 'XGBoost optimization', 'workers': 1}
     try:
-        opts, _ = getopt.getopt(argv, "hf:", ["file="])
+        opts, args = getopt.getopt(argv, "hf:", ["file=", "limit=", "chunksize=", "sparse", "tree-method=", "threads=",
+                                                 "study-storage=", "study-name=", "workers="])
     except getopt.GetoptError:
-        print('Usage: python script.py -f <filename>')
+        print(USAGE)
         sys.exit(2)
     for opt, arg in opts:
         if opt == '-h':
-            print('Usage: python script.py -f <filename>')
+            print(USAGE)
             sys.exit()
         elif opt in ("-f", "--file"):
-            inputfile = arg
+            options['inputfile'] = arg
+        elif opt == "--limit":
+            options['limit'] = int(arg)
+        elif opt == "--chunksize":
+            options['chunksize'] = int(arg)
+        elif opt == "--sparse":
+            options['sparse'] = True
+        elif opt == "--tree-method":
+            options['tree_method'] = arg
+        elif opt == "--threads":
+            options['threads'] = int(arg)
+        elif opt == "--study-storage":
+            options['study_storage'] = arg
+        elif opt == "--study-name":
+            options['study_name'] = arg
+        elif opt == "--workers":
+            options['workers'] = int(arg)
+
+    if options['inputfile'] == '' or len(args) < 2:
+        print(USAGE)
+        sys.exit(2)
 
-    if inputfile == '':
-        print('Usage: python script.py -f <filename>')
+    # Any other value would silently run inference
+    if args[1].lower() not in ('true', 'false'):
+        print(USAGE)
         sys.exit(2)
 
-    # Detect the encoding of the file
+    options['folder_path'] = args[0]
+    options['train'] = args[1].lower() == 'true'
+    return options
+
+def detect_encoding(inputfile, sample_bytes=ENCODING_SAMPLE_BYTES):
+    """
+    Detect the encoding of a file from a bounded sample of its first bytes.
+
+    Args:
+    - inputfile (str): Path to the file.
+    - sample_bytes (int, optional): Number of bytes to sample. Defaults to 1 MiB.
+
+    Returns:
+    - str: Detected encoding.
+    """
     with open(inputfile, 'rb') as f:
-        encoding = chardet.detect(f.read())['encoding']
+        return chardet.detect(f.read(sample_bytes))['encoding']
 
-    # Load the data with the detected encoding
-    df = pd.read_csv(inputfile, encoding=encoding)
+def load_data(inputfile, chunksize=10000, limit=None):
+    """
+    Stream data from a CSV file in chunks.
 
-    return df[:15]
+    Args:
+    - inputfile (str): Path to the CSV file.
+    - chunksize (int, optional): Rows per chunk. Defaults to 10000.
+    - limit (int, optional): Maximum number of rows to read. Defaults to None (all rows).
 
-def main(argv):
+    Returns:
+    - iterator: pandas.DataFrame chunks, each with a fresh RangeIndex.
     """
-    Main function to execute data processing steps.
+    encoding = detect_encoding(inputfile)
+
+    # Load the data with the detected encoding
+    with pd.read_csv(inputfile, encoding=encoding, chunksize=chunksize, nrows=limit) as reader:
+        for chunk in reader:
+            yield chunk.reset_index(drop=True)
+
+def save_stage(df, filename, first_chunk):
+    """
+    Write an output for one chunk, starting the file on the first chunk and appending afterwards.
 
     Args:
-    - argv (list): Command-line arguments.
+    - df (pandas.DataFrame): Output for the chunk.
+    - filename (str): Output CSV file.
+    - first_chunk (bool): Whether this is the first chunk.
     """
-    df = load_data(argv)
+    df.to_csv(filename, index=False, mode='w' if first_chunk else 'a', header=first_chunk)
 
+def clean_stage(df, stages):
+    """
+    Clean and reshape the raw survey columns.
+    """
     # Initialize InitialProcessor object
     initial_processing = InitialProcessor(df)
 
@@ -72,113 +147,243 @@ def main(argv):
     initial_processing.clean_organizations()
     initial_processing.reduce_earning_members()
 
-    df = initial_processing.df
-
-    # Save the cleaned data
-    cleaned_filename = 'cleaned_' + str(argv[1])
-    df.to_csv(cleaned_filename, index=False)
-
-    print(f"Cleaned data saved to {cleaned_filename}")
-    
-    print("Starting pincode processing...")
+    return initial_processing.df
 
-    pin_extractor = PincodeDetailsExtractor()
+def pincode_stage(df, stages):
+    """
+    Add district, region and state of both pincodes and the distance between them.
+    """
+    pin_extractor = stages['pin_extractor']
     # Process the data
-    pin_extractor.process_data(df)
+    pin_extractor.process_data_batch(df)
     # Get the processed data
     pin_data = pin_extractor.get_processed_data()
-    
-    df = pd.merge(df, pin_data, on='CandidateID', how='left')
-
-    with_pincode_details = 'with_pincode_details_' + str(argv[1])
-    df.to_csv(with_pincode_details, index=False)
-
-    print(f"Data with pincode details saved to {with_pincode_details}")
-
-    district_file_path = 'district_demographics.csv'
-    processor = DistrictDataProcessor(district_file_path)
-    processor.load_district_data()
+    pin_extractor.clear_processed_data()
 
-    df = processor.merge_district_data(df)
-
-    with_demographics = 'with_demographics_' + str(argv[1])
-    df.to_csv(with_demographics, index=False)
-
-    print(f"Data with demographics saved to {with_demographics}")
-
-    print("Starting company data processing...")
+    return pd.merge(df, pin_data, on='CandidateID', how='left')
 
+def demographics_stage(df, stages):
+    """
+    Add district demographics.
+    """
+    district_processor = stages['district_processor']
+    # Match rates are reported per chunk
+    district_processor.index.reset_counts()
+    df = district_processor.merge_district_data(df)
+    rates = district_processor.index.match_rates()
+    print(f"District match rates of this chunk over {rates['rows']} names: exact {rates['exact']:.1%}, normalized {rates['normalized']:.1%}, "
+          f"alias {rates['alias']:.1%}, fuzzy {rates['fuzzy']:.1%}, unmatched {rates['unmatched']:.1%}")
+    return df
+
+def company_stage(df, stages):
+    """
+    Add company information (scraping is currently disabled).
+    """
     #company_processor = CompanyScraper("Company", link_columns=3, sleep_interval=5)
     #company_info = company_processor.scrape(df.copy())
     #df = pd.merge(df, company_info, on='Company', how='left')
     #df.drop(columns=['Company','Link1'], inplace=True)
     #df.rename(columns={'Link2':'Company_1', 'Link3':'Company_2'}, inplace=True)
+    return df
 
-    with_company_info = 'with_company_info_' + str(argv[1])
-    df.to_csv(with_company_info, index=False)
-
-    print(f"Data with company information saved to {with_company_info}")
+def resume_stage(df, stages):
+    """
+    Add languages and skills found in the resumes.
+    """
+    processor = stages['resume_processor']
 
-    print("Starting resume processing...")
-    
-    folder_path = argv[2]
-    processor = ResumeProcessor(folder_path)
+    lang_df, skill_df = processor.process_dataframe(df.copy(), n_jobs=None)
 
-    lang_df, skill_df = processor.process_dataframe(df.copy())
+    if len(processor.failures):
+        print(f"Could not parse {len(processor.failures)} resumes:")
+        print(processor.failures.to_string(index=False))
 
     df = pd.merge(df, lang_df, on='CandidateID', how='left')
     df = pd.merge(df, skill_df, on='CandidateID', how='left')
 
-    df = df.drop_duplicates(subset=['CandidateID'], keep='first')
+    return df.drop_duplicates(subset=['CandidateID'], keep='first')
+
+# Pipeline stages in order: (checkpoint name, stage function, code the stage output depends on)
+PIPELINE = [
+    ('cleaned', clean_stage, [inspect.getmodule(InitialProcessor)]),
+    ('with_pincode_details', pincode_stage, [inspect.getmodule(PincodeDetailsExtractor), PincodeIndex,
+                                             inspect.getmodule(GeocodeCache), inspect.getmodule(GeocodingClient)]),
+    ('with_demographics', demographics_stage, [inspect.getmodule(DistrictDataProcessor), DistrictIndex, PincodeIndex]),
+    ('with_company_info', company_stage, []),
+    ('cvmerged', resume_stage, [inspect.getmodule(ResumeProcessor), SkillMatcher, inspect.getmodule(file_sha256)]),
+]
+
+def stage_configs(stages, folder_path):
+    """
+    Collect the configuration each stage's output depends on besides its input and code.
+
+    Args:
+    - stages (dict): Long-lived stage objects.
+    - folder_path (str): Folder containing the resumes.
+
+    Returns:
+    - dict: Stage name to JSON-serializable configuration.
+    """
+    pin_extractor = stages['pin_extractor']
+    district_processor = stages['district_processor']
+    resume_processor = stages['resume_processor']
+    return {
+        'with_pincode_details': {'distance_method': pin_extractor.distance_method,
+                                 'geo_index': file_sha256(pin_extractor.geo_index.index_path)
+                                 if os.path.exists(pin_extractor.geo_index.index_path) else None},
+        'with_demographics': {'district_file': file_sha256(district_processor.district_file_path)},
+        'cvmerged': {'resumes': folder_fingerprint(folder_path),
+                     'vocabulary': resume_processor.vocabulary_fingerprint()},
+    }
+
+def process_chunk(df, stages, checkpoints, configs, chunk):
+    """
+    Run one chunk of candidates through the cleaning and enrichment stages.
+    Every stage output is compacted (categorical strings, downcast numbers) and checkpointed; stages whose checkpoint matches the current input, code and
+    configuration are skipped, and processing restarts from the last valid checkpoint.
+
+    Args:
+    - df (pandas.DataFrame): Raw chunk.
+    - stages (dict): Long-lived stage objects, created once for all chunks.
+    - checkpoints (StageCheckpoints): Checkpoint store.
+    - configs (dict): Stage configurations, see stage_configs.
+    - chunk (int): Chunk number.
 
-    cvmerged = 'cvmerged_' + str(argv[1])
-    df.to_csv(cvmerged, index=False)
+    Returns:
+    - pandas.DataFrame: Enriched chunk, one row per candidate.
+    """
+    # Chained fingerprints of every stage output for this chunk
+    fingerprint = frame_fingerprint(df)
+    fingerprints = []
+    for name, function, code in PIPELINE:
+        fingerprint = checkpoints.stage_fingerprint(fingerprint, name, source_fingerprint(code + [function, Compaction]),
+                                                    configs.get(name))
+        fingerprints.append(fingerprint)
+
+    # Restart after the last stage with a valid checkpoint
+    start = 0
+    for i in reversed(range(len(PIPELINE))):
+        restored = checkpoints.load(PIPELINE[i][0], chunk, fingerprints[i])
+        if restored is not None:
+            print(f"Chunk {chunk}: reusing checkpoint of stage {PIPELINE[i][0]}")
+            df, start = restored, i + 1
+            break
+
+    for (name, function, _), fingerprint in zip(PIPELINE[start:], fingerprints[start:]):
+        print(f"Chunk {chunk}: running stage {name}...")
+        df = function(df, stages)
+        # Compact every stage output, so later stages and checkpoints work on the smaller frame
+        size_before = bytes_per_row(df)
+        df = compact_dataframe(df)
+        print(f"Chunk {chunk}: stage {name} uses {size_before:.0f} -> {bytes_per_row(df):.0f} bytes per candidate")
+        path = checkpoints.save(name, chunk, fingerprint, df)
+        print(f"Chunk {chunk}: stage {name} saved to {path}")
+
+    return df
 
-    print(f"Data with resume information saved to {cvmerged}")
+def main(argv):
+    """
+    Main function to execute data processing steps.
+    The input is streamed in chunks; each chunk goes through every stage before the next one
+    is read, so memory stays flat regardless of input size. Training needs the whole set, so
+    in training mode only the preprocessed feature rows of each chunk are kept.
+    With --sparse, features go to the model as a CSR matrix instead of a dense DataFrame, for
+    training and inference alike.
 
-    preprocessor = Preprocessor()
+    Args:
+    - argv (list): Command-line arguments.
+    """
+    options = parse_args(argv)
+    inputfile = options['inputfile']
+    train = options['train']
+    sparse = options['sparse']
+
+    # Stage objects are created once and reused for every chunk
+    geocoding_client = GeocodingClient()
+    district_processor = DistrictDataProcessor('district_demographics.csv')
+    district_processor.load_district_data()
+    stages = {
+        'pin_extractor': PincodeDetailsExtractor(geocode_cache=GeocodeCache(), geocoding_client=geocoding_client),
+        'district_processor': district_processor,
+        'resume_processor': ResumeProcessor(options['folder_path'], cache_path='resume_cache.sqlite'),
+    }
+    # Stage outputs are checkpointed per chunk so a rerun skips unchanged work
+    checkpoints = StageCheckpoints(os.path.join('checkpoints', os.path.basename(inputfile)))
+    configs = stage_configs(stages, options['folder_path'])
 
-    # Preprocess data
-    CandidateID = df['CandidateID']
-    df = preprocessor.preprocess(df.copy())
-    
     model = None
+    if not train:
+        # Load the model from the file
+        with open('xgboost_model.pkl', 'rb') as f:
+            model = pickle.load(f)
 
-    # Check if training flag is provided
-    if argv[3] == 'true':
-        
-        target_col = 'Performance'
-        feature_cols = [col for col in df.columns if col not in ['CandidateID', 'Company', target_col]]
+    # Feature columns and dtypes, loaded once for all chunks in the order the model was fit with
+    schema = FeatureSchema.for_model(model, sparse=sparse)
+    # Training defines the skill columns; inference uses the vocabulary saved with the model
+    preprocessor = Preprocessor(schema=schema, skill_vocabulary=SkillVocabulary.build() if train and sparse else None)
 
-        # Create a ModelTrainer object
-        trainer = ModelTrainer(train_data=df , target_col=target_col, feature_cols=feature_cols)
+    target_col = 'Performance'
+    training_chunks = []
 
-        trainer.optimize_hyperparams()
+    for i, chunk in enumerate(load_data(inputfile, chunksize=options['chunksize'], limit=options['limit'])):
+        first_chunk = i == 0
+        df = process_chunk(chunk, stages, checkpoints, configs, i)
+
+        # Preprocess data
+        CandidateID = df['CandidateID'].to_numpy()
+        if sparse:
+            if train:
+                training_chunks.append((df[['CandidateID', target_col]].reset_index(drop=True),
+                                        preprocessor.sparse_matrix(df.copy())))
+                continue
+            features = preprocessor.sparse_matrix(df.copy())
+        else:
+            df = preprocessor.preprocess(df.copy())
+            if train:
+                training_chunks.append(df)
+                continue
+            features = schema.to_matrix(df)
+
+        # Predict using the loaded model on the float32 feature matrix
+        predictions = predictions_frame(model.predict_proba(features), CandidateID)
+
+        save_stage(predictions, "predictions.csv", first_chunk)
+
+    geocoding_client.close()
+
+    # Check if training flag is provided
+    if train:
+        if sparse:
+            # Every chunk matrix already has the schema's feature and skill columns
+            df = pd.concat([targets for targets, _ in training_chunks], ignore_index=True)
+            matrix = scipy.sparse.vstack([chunk_matrix for _, chunk_matrix in training_chunks], format='csr')
+            trainer = ModelTrainer(train_data=df, target_col=target_col, feature_cols=preprocessor.sparse_feature_names(),
+                                   matrix=matrix, tree_method=options['tree_method'], n_jobs=options['threads'])
+        else:
+            # Every chunk was conformed to the schema; train on its columns in the order inference builds them
+            df = pd.concat(training_chunks, ignore_index=True)
+
+            # Create a ModelTrainer object
+            trainer = ModelTrainer(train_data=df , target_col=target_col, feature_cols=schema.features,
+                                   tree_method=options['tree_method'], n_jobs=options['threads'])
+
+        trainer.optimize_hyperparams(storage=options['study_storage'], study_name=options['study_name'],
+                                     n_workers=options['workers'])
 
         model = trainer.train_final_model()  
         with open('xgboost_model.pkl', 'wb') as f:
             pickle.dump(model, f)
         
         print("Model saved as xgboost_model.pkl")
+        if sparse:
+            preprocessor.get_skill_vocabulary().save()
+            print("Skill vocabulary saved as skill_vocabulary.pkl")
+
+        # Array-backed copy of the trees for scoring without xgboost
+        tree_model = export_trees(model, 'xgboost_trees.npz')
+        parity = check_parity(model, tree_model, trainer.X)
+        print(f"Trees saved as xgboost_trees.npz (max probability difference {parity['max_abs_difference']:.2e})")
     else:
-        # Load the model from the file
-        with open('xgboost_model.pkl', 'rb') as f:
-            model = pickle.load(f)
-        
-        target_col = 'Performance'
-        with open('features.pkl', 'rb') as f:
-            feature_cols = pickle.load(f)
-        
-        # Predict using the loaded model
-        predictions = model.predict_proba(df[feature_cols])
-        predictions = pd.DataFrame(predictions, columns=['Class_1', 'Class_2'])
-        predictions['CandidateID'] = CandidateID
-
-        predictions['Performance'] = np.where(predictions['Class_2'] > predictions['Class_1'], 1, 0)
-        predictions['CandidateID'] = predictions['CandidateID'].str.upper()
-
-        predictions.to_csv("predictions.csv", index=False)
-
         print("Predictions saved as predictions.csv")
 
 if __name__ == "__main__":
@@ -0,0 +1,34 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from Demographics import DistrictDataProcessor
+
+DISTRICT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Data_source',
+                             'district_demographics.csv')
+
+
+@pytest.fixture(scope='module')
+def processor():
+    processor = DistrictDataProcessor(DISTRICT_FILE)
+    processor.load_district_data()
+    return processor
+
+
+def test_block_states_are_inferred(processor):
+    states = dict(zip(processor.districts['Ddistrict'], processor.states))
+    assert states['balasore'] == 'odisha'
+    assert states['bageshwar'] == 'uttarakhand'
+    assert states['deoghar'] == 'jharkhand'
+
+
+def test_renamed_odisha_districts_get_their_own_demographics(processor):
+    df = pd.DataFrame({'R_District': ['baleshwar', 'deogarh', 'bageshwar'],
+                       'R_State': ['odisha', 'odisha', 'uttarakhand'],
+                       'B_District': ['nowhere', None, 'deoghar'],
+                       'B_State': ['odisha', None, 'jharkhand']})
+    merged = processor.merge_district_data(df)
+    np.testing.assert_array_equal(merged['R_Population'], [2317419, 312164, 259840])
+    assert np.isnan(merged['B_Population'][0])
+    assert np.isnan(merged['B_Population'][1])
+    assert merged['B_Population'][2] == 1491879
@@ -0,0 +1,49 @@
+import numpy as np
+from DistrictIndex import DistrictIndex
+
+# A few rows of district_demographics.csv with the states inferred for their blocks
+NAMES = ['bageshwar', 'balasore', 'debagarh', 'deoghar', 'aurangabad', 'aurangabad', 'tiruvallur', 'tiruvarur']
+STATES = ['uttarakhand', 'odisha', 'odisha', 'jharkhand', 'bihar', 'maharashtra', 'tamil nadu', 'tamil nadu']
+
+
+def test_renamed_districts_resolve_through_aliases():
+    index = DistrictIndex(NAMES, states=STATES)
+    assert index.resolve('baleshwar', 'odisha') == (NAMES.index('balasore'), 'alias')
+    assert index.resolve('deogarh', 'odisha') == (NAMES.index('debagarh'), 'alias')
+
+
+def test_fuzzy_matching_stays_within_the_state():
+    index = DistrictIndex(NAMES, states=STATES, aliases={})
+    # Close spellings of districts in other states used to be accepted
+    assert index.resolve('baleshwar', 'odisha') == (-1, 'unmatched')
+    assert index.resolve('deogarh', 'odisha') == (-1, 'unmatched')
+    assert index.resolve('bageshwer', 'uttarakhand') == (NAMES.index('bageshwar'), 'fuzzy')
+
+
+def test_fuzzy_matching_needs_a_known_state():
+    index = DistrictIndex(NAMES, states=STATES)
+    assert index.resolve('bageshwer', None) == (-1, 'unmatched')
+
+
+def test_fuzzy_matching_needs_a_clear_winner():
+    index = DistrictIndex(NAMES, states=STATES)
+    assert index.resolve('thiruvallur', 'tamil nadu') == (NAMES.index('tiruvallur'), 'fuzzy')
+    # Equally close to both districts of the state
+    index = DistrictIndex(['raipur', 'rampur'], states=['some state', 'some state'])
+    assert index.resolve('raimpur', 'some state') == (-1, 'unmatched')
+
+
+def test_shared_names_pick_the_row_state():
+    index = DistrictIndex(NAMES, states=STATES)
+    assert index.resolve('aurangabad', 'maharashtra') == (5, 'exact')
+    assert index.resolve('aurangabad', 'bihar') == (4, 'exact')
+
+
+def test_resolve_many_counts_rows():
+    index = DistrictIndex(NAMES, states=STATES)
+    codes = index.resolve_many(['baleshwar', 'baleshwar', None, 'deoghar'], ['odisha', 'odisha', None, 'jharkhand'])
+    np.testing.assert_array_equal(codes, [1, 1, -1, 3])
+    rates = index.match_rates()
+    assert rates['rows'] == 4
+    assert rates['alias'] == 0.5
+    assert rates['unmatched'] == 0.25
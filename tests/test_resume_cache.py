@@ -0,0 +1,36 @@
+import os
+import pandas as pd
+from docx import Document
+from CVManual import ResumeProcessor, resume_path
+
+
+def write_resume(folder, candidate_id, text):
+    document = Document()
+    document.add_paragraph(text)
+    document.save(resume_path(folder, candidate_id))
+
+
+def skill_counts(folder, tmp_path):
+    processor = ResumeProcessor(folder, skills_file=str(tmp_path / 'skills.csv'),
+                                cache_path=str(tmp_path / 'resume_cache.sqlite'))
+    _, skill_df = processor.process_dataframe(pd.DataFrame({'CandidateID': ['c1', 'c2']}), n_jobs=1)
+    processor.cache.close()
+    return skill_df['Skill_count'].tolist()
+
+
+def test_missing_resume_is_not_cached_as_empty(tmp_path):
+    pd.DataFrame({'skill_name': ['sales', 'wireless', 'key account management']}).to_csv(tmp_path / 'skills.csv')
+    folder = tmp_path / 'resumes'
+    folder.mkdir()
+    write_resume(folder, 'c1', 'Sales lead for wireless products and key account management.')
+    write_resume(folder, 'c2', 'Wireless sales.')
+
+    assert skill_counts(folder, tmp_path) == [3, 2]
+
+    # The file disappears for a run, then comes back with the same size and mtime
+    missing = tmp_path / 'c1.docx'
+    os.rename(resume_path(folder, 'c1'), missing)
+    assert skill_counts(folder, tmp_path) == [0, 2]
+    os.rename(missing, resume_path(folder, 'c1'))
+
+    assert skill_counts(folder, tmp_path) == [3, 2]